@@ -0,0 +1,89 @@
+"""
+Measure LLM calls and latency per chat turn for both agent modes.
+
+    python -m benchmarks.chatbot_turn --user-id <id> [--transcript-id <id>] [--runs N]
+
+"synthesis" routes tool results through a separate synthesis call (the
+previous behaviour); "react" lets the tool-bound model answer directly.
+Needs the same OpenAI, Postgres and Redis settings as the app. Every run
+uses a fresh conversation so history does not accumulate.
+"""
+
+import argparse
+import statistics
+import time
+import uuid
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from src.agent.chatbot import create_rag_agent, rag_agent_config
+from src.agent.connection import get_vectorstore
+from src.agent.history import history_store
+from src.agent.memory import conversation_memory
+from src.agent.state import ChatBotState
+from src.flask.main import llm
+
+DEFAULT_QUERIES = [
+    "What is a mind map?",
+    "Summarize the main decisions from the meeting transcript.",
+    "Who spoke about the tooltip position in the meeting?",
+]
+
+
+class LLMCallCounter(BaseCallbackHandler):
+    def __init__(self):
+        self.calls = 0
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.calls += 1
+
+
+def run_turn(chatbot, query: str, args, synthesis: bool) -> tuple[int, float]:
+    conversation_id = str(uuid.uuid4())
+    config = rag_agent_config(
+        args.user_id, conversation_id, args.transcript_id, synthesis=synthesis
+    )
+    counter = LLMCallCounter()
+    config["callbacks"] = [counter]
+
+    start = time.perf_counter()
+    chatbot.invoke(ChatBotState(messages=[HumanMessage(content=query)]), config=config)
+    elapsed = time.perf_counter() - start
+
+    history_store.clear(conversation_id)
+    conversation_memory.clear(conversation_id)
+    return counter.calls, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--user-id", required=True)
+    parser.add_argument("--transcript-id")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--query", action="append", dest="queries")
+    args = parser.parse_args()
+
+    chatbot = create_rag_agent(MemorySaver(), llm, get_vectorstore())
+    queries = args.queries or DEFAULT_QUERIES
+
+    print(f"{'mode':<10} {'query':<60} {'llm calls':>9} {'median s':>9}")
+    for mode, synthesis in (("synthesis", True), ("react", False)):
+        all_calls, all_latencies = [], []
+        for query in queries:
+            results = [run_turn(chatbot, query, args, synthesis) for _ in range(args.runs)]
+            calls = [result[0] for result in results]
+            latencies = [result[1] for result in results]
+            all_calls.extend(calls)
+            all_latencies.extend(latencies)
+            print(
+                f"{mode:<10} {query[:60]:<60} "
+                f"{statistics.mean(calls):>9.1f} {statistics.median(latencies):>9.2f}"
+            )
+        print(
+            f"{mode:<10} {'(all queries)':<60} "
+            f"{statistics.mean(all_calls):>9.1f} {statistics.median(all_latencies):>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
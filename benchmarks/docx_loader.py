@@ -0,0 +1,72 @@
+"""
+Compare the native DOCX reader with UnstructuredLoader.
+
+    python -m benchmarks.docx_loader [path] [--runs N]
+
+Import time is reported separately from per-load time, since most of
+Unstructured's cost on a cold worker is its import graph.
+"""
+
+import argparse
+import statistics
+import time
+
+DEFAULT_PATH = "uploads/test_file.docx"
+
+
+def _time_runs(load, runs: int):
+    timings = []
+    text = ""
+    for _ in range(runs):
+        start = time.perf_counter()
+        text = load()
+        timings.append(time.perf_counter() - start)
+    return timings, text
+
+
+def _report(name: str, import_time: float, timings: list, text: str):
+    print(
+        f"{name:<14} import {import_time * 1000:8.1f} ms | "
+        f"load median {statistics.median(timings) * 1000:8.2f} ms "
+        f"min {min(timings) * 1000:8.2f} ms | {len(text)} chars"
+    )
+
+
+def benchmark_native(path: str, runs: int):
+    start = time.perf_counter()
+    from src.agent.loaders import load_docx
+
+    import_time = time.perf_counter() - start
+    timings, text = _time_runs(lambda: load_docx(path), runs)
+    _report("native", import_time, timings, text)
+
+
+def benchmark_unstructured(path: str, runs: int):
+    start = time.perf_counter()
+    try:
+        from langchain_unstructured.document_loaders import UnstructuredLoader
+    except ImportError as e:
+        print(f"unstructured   skipped: {e}")
+        return
+    import_time = time.perf_counter() - start
+
+    def load():
+        documents = UnstructuredLoader(file_path=path).load()
+        return "\n".join([doc.page_content for doc in documents])
+
+    timings, text = _time_runs(load, runs)
+    _report("unstructured", import_time, timings, text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", nargs="?", default=DEFAULT_PATH)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    benchmark_native(args.path, args.runs)
+    benchmark_unstructured(args.path, args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+"""
+Cache backends shared by the agent pipeline.
+
+Values are stored as strings. The in-memory backend is an LRU with
+per-entry TTL; the Redis backend uses the shared connection pool so cached
+values are visible to every app and worker process.
+"""
+
+import hashlib
+import inspect
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Optional, Sequence
+import numpy as np
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.messages import HumanMessage
+from langchain_core.outputs import Generation
+from src.agent import prompts
+from src.agent.connection import embeddings, get_redis
+from src.agent.state import TranscriptState
+
+CACHE_BACKEND = os.getenv(
+    "CACHE_BACKEND", "redis" if os.getenv("REDIS_HOST") else "memory"
+)
+
+PIPELINE_VERSION = "9"
+PIPELINE_CACHE_TTL = int(os.getenv("PIPELINE_CACHE_TTL", str(7 * 24 * 3600)))
+PIPELINE_CACHE_SIZE = int(os.getenv("PIPELINE_CACHE_SIZE", "128"))
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "2048"))
+LLM_CACHE_SEMANTIC = os.getenv("LLM_CACHE_SEMANTIC", "false").lower() == "true"
+LLM_CACHE_SEMANTIC_THRESHOLD = float(os.getenv("LLM_CACHE_SEMANTIC_THRESHOLD", "0.97"))
+LLM_CACHE_SEMANTIC_SIZE = int(os.getenv("LLM_CACHE_SEMANTIC_SIZE", "1024"))
+SEMANTIC_MAX_CHARS = 8000
+
+# Structured-output schemas whose calls are idempotent classifications and may
+# be answered by a near-duplicate payload, mapped to the prompt function that
+# wraps the payload. Text-transform calls must never be listed here.
+SEMANTIC_CALLS = {
+    "QualityCheckOutput": prompts.MindMapPrompts.quality_check_prompt,
+}
+STRUCTURED_OUTPUT_NAME = re.compile(r"'ls_structured_output_format'.*?'name': '(\w+)'")
+PAYLOAD_PLACEHOLDER = "\x00payload\x00"
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]: ...
+
+    @abstractmethod
+    def set(self, key: str, value: str, ttl: Optional[int] = None) -> None: ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+
+class MemoryCache(CacheBackend):
+    """Thread-safe LRU cache with a per-entry TTL."""
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[int] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[Optional[float], str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache(CacheBackend):
+    """Redis cache where every key is prefixed with a namespace."""
+
+    def __init__(self, namespace: str, ttl: Optional[int] = None):
+        self.namespace = namespace
+        self.ttl = ttl
+
+    def _key(self, key: str) -> str:
+        return f"cache:{self.namespace}:{key}"
+
+    def get(self, key: str) -> Optional[str]:
+        value = get_redis().get(self._key(key))
+        return value.decode("utf-8") if value is not None else None
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        get_redis().set(self._key(key), value, ex=ttl if ttl is not None else self.ttl)
+
+    def delete(self, key: str) -> None:
+        get_redis().delete(self._key(key))
+
+    def clear(self) -> None:
+        """Delete every key under this cache's namespace."""
+        client = get_redis()
+        batch = []
+        for key in client.scan_iter(match=self._key("*"), count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                client.delete(*batch)
+                batch = []
+        if batch:
+            client.delete(*batch)
+
+
+def create_cache(
+    namespace: str, max_size: int = 1024, ttl: Optional[int] = None
+) -> CacheBackend:
+    """Create a cache for the configured CACHE_BACKEND."""
+    if CACHE_BACKEND == "redis":
+        return RedisCache(namespace, ttl=ttl)
+    return MemoryCache(max_size=max_size, ttl=ttl)
+
+
+def _prompts_version() -> str:
+    return hashlib.sha256(inspect.getsource(prompts).encode("utf-8")).hexdigest()[:12]
+
+
+class PipelineResultCache:
+    """Cache of transcript_graph results keyed by the uploaded file's content.
+
+    Keys combine the SHA-256 of the uploaded bytes, the file extension and the
+    pipeline version (PIPELINE_VERSION plus a hash of the prompts), so any
+    prompt change invalidates previous results.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.version = f"{PIPELINE_VERSION}-{_prompts_version()}"
+
+    def key(self, file_hash: str, file_name: str) -> str:
+        extension = os.path.splitext(file_name)[1].lower()
+        return f"{self.version}:{extension}:{file_hash}"
+
+    def get(self, file_hash: str, file_name: str) -> Optional[TranscriptState]:
+        payload = self.backend.get(self.key(file_hash, file_name))
+        if payload is None:
+            return None
+        return TranscriptState.model_validate_json(payload)
+
+    def set(self, file_hash: str, file_name: str, state: TranscriptState) -> None:
+        payload = state.model_dump_json()
+        self.backend.set(self.key(file_hash, file_name), payload)
+
+
+pipeline_cache = PipelineResultCache(
+    create_cache("pipeline", max_size=PIPELINE_CACHE_SIZE, ttl=PIPELINE_CACHE_TTL)
+)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so formatting-only differences share a cache entry."""
+    return re.sub(r"\s+", " ", prompt).strip()
+
+
+def semantic_payload(prompt: str, llm_string: str) -> Optional[str]:
+    """Return the variable payload of an allow-listed call, or None.
+
+    Only calls bound to a schema in SEMANTIC_CALLS qualify. The payload is the
+    last human message with the prompt template stripped, so the shared
+    template text does not dominate the embedding. Payloads longer than
+    SEMANTIC_MAX_CHARS are skipped rather than truncated.
+    """
+    match = STRUCTURED_OUTPUT_NAME.search(llm_string)
+    template = SEMANTIC_CALLS.get(match.group(1)) if match else None
+    if template is None:
+        return None
+    try:
+        messages = loads(prompt, allowed_objects="messages")
+    except Exception:
+        return None
+    human = [message for message in messages if isinstance(message, HumanMessage)]
+    if not human or not isinstance(human[-1].content, str):
+        return None
+    content = human[-1].content
+    prefix, _, suffix = template(PAYLOAD_PLACEHOLDER).partition(PAYLOAD_PLACEHOLDER)
+    if not content.startswith(prefix) or not content.endswith(suffix):
+        return None
+    payload = content[len(prefix) : len(content) - len(suffix)].strip()
+    if not payload or len(payload) > SEMANTIC_MAX_CHARS:
+        return None
+    return payload
+
+
+class SemanticIndex:
+    """Bounded in-process index from payload embeddings to cache keys.
+
+    Vectors are stored normalized in a fixed-size matrix, so a search is one
+    matrix-vector product. Once full, the oldest slot is overwritten.
+    """
+
+    def __init__(self, threshold: float, max_size: int):
+        self.threshold = threshold
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._vectors: Optional[np.ndarray] = None
+        self._groups = np.full(self.max_size, -1, dtype=np.int64)
+        self._group_ids: dict[str, int] = {}
+        self._keys: list[Optional[str]] = [None] * self.max_size
+        self._slots: dict[str, int] = {}
+        self._next = 0
+        # Vectors embedded by a lookup miss, kept for the update that follows.
+        self._pending: OrderedDict[str, np.ndarray] = OrderedDict()
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.asarray(embeddings.embed_query(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def remember(self, key: str, vector: np.ndarray) -> None:
+        with self._lock:
+            self._pending[key] = vector
+            while len(self._pending) > self.max_size:
+                self._pending.popitem(last=False)
+
+    def take(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            return self._pending.pop(key, None)
+
+    def nearest(self, llm_string: str, vector: np.ndarray) -> Optional[str]:
+        with self._lock:
+            group = self._group_ids.get(llm_string)
+            if group is None or self._vectors is None:
+                return None
+            scores = self._vectors @ vector
+            scores[self._groups != group] = -1.0
+            best = int(np.argmax(scores))
+            return self._keys[best] if scores[best] >= self.threshold else None
+
+    def add(self, key: str, llm_string: str, vector: np.ndarray) -> None:
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_size, len(vector)), dtype=np.float32)
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._next
+                self._next = (self._next + 1) % self.max_size
+                evicted = self._keys[slot]
+                if evicted is not None:
+                    del self._slots[evicted]
+                self._keys[slot] = key
+                self._slots[key] = slot
+            self._vectors[slot] = vector
+            self._groups[slot] = self._group_ids.setdefault(
+                llm_string, len(self._group_ids)
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+
+
+class LLMResponseCache(BaseCache):
+    """LangChain LLM cache over a CacheBackend, with hit/miss counters.
+
+    Keys combine the model configuration (llm_string, which includes the
+    model name and bound tools/schemas), the prompt version and the
+    whitespace-normalized prompt. With a SemanticIndex, an exact miss on an
+    allow-listed classification call (see SEMANTIC_CALLS) falls back to the
+    closest previous payload for the same model by embedding.
+    """
+
+    def __init__(
+        self, backend: CacheBackend, semantic_index: Optional[SemanticIndex] = None
+    ):
+        self.backend = backend
+        self.semantic_index = semantic_index
+        self.version = _prompts_version()
+        self._counters = {"hits": 0, "semantic_hits": 0, "misses": 0, "updates": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _key(self, prompt: str, llm_string: str) -> str:
+        raw = f"{llm_string}\x00{self.version}\x00{normalize_prompt(prompt)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _load(self, key: str) -> Optional[Sequence[Generation]]:
+        payload = self.backend.get(key)
+        if payload is None:
+            return None
+        try:
+            return loads(payload)
+        except Exception as e:
+            print(f"Warning: Discarding unreadable LLM cache entry: {e}")
+            self.backend.delete(key)
+            return None
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = self._key(prompt, llm_string)
+        generations = self._load(key)
+        if generations is not None:
+            self._count("hits")
+            return generations
+
+        payload = (
+            semantic_payload(prompt, llm_string)
+            if self.semantic_index is not None
+            else None
+        )
+        if payload is not None:
+            vector = self.semantic_index.embed(payload)
+            self.semantic_index.remember(key, vector)
+            nearest = self.semantic_index.nearest(llm_string, vector)
+            generations = self._load(nearest) if nearest else None
+            if generations is not None:
+                self._count("semantic_hits")
+                return generations
+
+        self._count("misses")
+        return None
+
+    def update(
+        self, prompt: str, llm_string: str, return_val: Sequence[Generation]
+    ) -> None:
+        key = self._key(prompt, llm_string)
+        self.backend.set(key, dumps(list(return_val)))
+        if self.semantic_index is not None:
+            vector = self.semantic_index.take(key)
+            if vector is None:
+                payload = semantic_payload(prompt, llm_string)
+                vector = self.semantic_index.embed(payload) if payload else None
+            if vector is not None:
+                self.semantic_index.add(key, llm_string, vector)
+        self._count("updates")
+
+    def clear(self, **kwargs: Any) -> None:
+        """Drop every stored response and the semantic index."""
+        self.backend.clear()
+        if self.semantic_index is not None:
+            self.semantic_index.clear()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            for counter in self._counters:
+                self._counters[counter] = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["semantic_hits"] + counters["misses"]
+        hits = counters["hits"] + counters["semantic_hits"]
+        counters["hit_rate"] = hits / lookups if lookups else 0.0
+        return counters
+
+
+llm_cache = (
+    LLMResponseCache(
+        create_cache("llm", max_size=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL),
+        (
+            SemanticIndex(LLM_CACHE_SEMANTIC_THRESHOLD, LLM_CACHE_SEMANTIC_SIZE)
+            if LLM_CACHE_SEMANTIC
+            else None
+        ),
+    )
+    if LLM_CACHE_ENABLED
+    else None
+)
@@ -1,74 +1,41 @@
-from typing import Optional
-import uuid
+import os
+from typing import AsyncIterator, Optional
 from langchain_core.messages import SystemMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.runnables import RunnableWithMessageHistory
-from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langchain_openai import ChatOpenAI
 from langchain_postgres import PGVector
 from langgraph.graph import StateGraph, START, END
 from langgraph.prebuilt import tools_condition
 from langgraph.prebuilt.tool_node import ToolNode
-from src.agent.connection import get_redis_history
+from src.agent.history import history_store
+from src.agent.memory import conversation_memory
 from langchain_core.messages import BaseMessage
 from src.agent.prompts import ChatBotPrompts
+from src.agent.scheduler import Priority, scheduled
 from src.agent.state import ChatBotState
-from langchain_core.tools.retriever import create_retriever_tool
+from langchain_core.tools import tool
 
 from src.agent.tools import tools
 
-
-class FilteredChatMessageHistory(BaseChatMessageHistory):
-    """Wrapper around Redis history that filters out tool messages for clean conversation flow."""
-
-    def __init__(self, session_id: str):
-        self.session_id = session_id
-        self._redis_history = get_redis_history(session_id)
-
-    @property
-    def messages(self) -> list[BaseMessage]:
-        """Return messages filtered to exclude tool messages."""
-        all_messages = self._redis_history.messages
-        filtered_messages = [
-            msg
-            for msg in all_messages
-            if not (
-                hasattr(msg, "additional_kwargs")
-                and msg.additional_kwargs.get("tool_calls") is not None
-            )
-        ]
-        return filtered_messages
-
-    def add_message(self, message: BaseMessage) -> None:
-        """Add message to Redis history."""
-        id = message.id
-        if id is None:
-            id = str(uuid.uuid4())
-        message.additional_kwargs["id"] = id
-        print(message)
-        self._redis_history.add_message(message)
-
-    def clear(self) -> None:
-        """Clear Redis history."""
-        self._redis_history.clear()
+CHATBOT_SYNTHESIS = os.getenv("CHATBOT_SYNTHESIS", "false").lower() == "true"
 
 
-def get_filtered_redis_history(session_id: str) -> FilteredChatMessageHistory:
-    """Get filtered Redis history that excludes tool messages."""
-    return FilteredChatMessageHistory(session_id)
-
-
-def create_rag_agent(
-    checkpoint,
-    llm: ChatOpenAI,
-    vectorstore: PGVector,
+def rag_agent_config(
     user_id: str,
     conversation_id: str,
     transcript_id: Optional[str] = None,
-):
-    config = {
+    synthesis: Optional[bool] = None,
+) -> RunnableConfig:
+    """Build the per-request config for the compiled RAG agent."""
+    return {
         "configurable": {
+            "thread_id": conversation_id,
+            "checkpoint_ns": "",
             "session_id": conversation_id,
+            "user_id": user_id,
+            "transcript_id": transcript_id,
+            "synthesis": synthesis,
         },
         "metadata": {
             "user_id": user_id,
@@ -77,77 +44,154 @@ def create_rag_agent(
         },
     }
 
-    filters = {
-        "user_id": user_id,
-    }
-    if transcript_id:
-        filters["transcript_id"] = transcript_id
 
+def create_transcript_retriever_tool(vectorstore: PGVector):
+    """Create a retriever tool whose filters are read from the run config."""
+
+    @tool("transcript_retriever", parse_docstring=True)
+    def transcript_retriever(query: str, config: RunnableConfig) -> str:
+        """A tool that can retrieve information from the transcript or meeting
+
+        Args:
+            query: query to look up in the transcript
+        """
+        configurable = config.get("configurable", {})
+        filters = {
+            "user_id": configurable.get("user_id"),
+        }
+        if configurable.get("transcript_id"):
+            filters["transcript_id"] = configurable["transcript_id"]
+
+        documents = vectorstore.similarity_search(query, k=3, filter=filters)
+        return "\n\n".join(doc.page_content for doc in documents)
+
+    return transcript_retriever
+
+
+def synthesis_enabled(config: RunnableConfig) -> bool:
+    """Synthesis mode can be switched on per run through the config."""
+    synthesis = config.get("configurable", {}).get("synthesis")
+    return CHATBOT_SYNTHESIS if synthesis is None else bool(synthesis)
+
+
+def current_turn(messages: list[BaseMessage]) -> list[BaseMessage]:
+    """Messages from the latest human message onwards: the query plus any
+    tool calls and tool results produced for it so far."""
+    for index in range(len(messages) - 1, -1, -1):
+        if messages[index].type == "human":
+            return messages[index:]
+    return messages
+
+
+def previous_messages(
+    messages: list[BaseMessage], turn: list[BaseMessage]
+) -> list[BaseMessage]:
+    """Messages from earlier turns, as held in the checkpointed state."""
+    return messages[: len(messages) - len(turn)]
+
+
+def create_rag_agent(
+    checkpoint,
+    llm: ChatOpenAI,
+    vectorstore: PGVector,
+):
+    """Compile the RAG agent once.
+
+    The agent is a ReAct loop: the tool-bound model either calls tools,
+    whose results are fed back to it, or answers directly. In synthesis mode
+    (CHATBOT_SYNTHESIS or configurable "synthesis") tool results are instead
+    summarized by a separate model call without tools.
+
+    Per-request values (user_id, conversation_id, transcript_id) are passed
+    through the run config, see rag_agent_config.
+    """
     prompt = ChatPromptTemplate.from_messages(
         [
             ("system", ChatBotPrompts.CHATBOT_SYSTEM),
             MessagesPlaceholder(variable_name="history"),
-            ("human", "{input}"),
+            MessagesPlaceholder(variable_name="turn"),
         ]
     )
 
-    retriever = vectorstore.as_retriever(
-        search_kwargs={
-            "k": 3,
-            "filter": filters,
-        }
-    )
-    retriever_tool = create_retriever_tool(
-        retriever,
-        name="transcript_retriever",
-        description="A tool that can retrieve information from the transcript or meeting",
-    )
+    retriever_tool = create_transcript_retriever_tool(vectorstore)
     all_tools = [retriever_tool] + tools
 
-    llm_with_tools = llm.bind_tools(all_tools)
+    # Chat calls go through the shared scheduler ahead of ingestion work.
+    llm_with_tools = scheduled(
+        llm.bind_tools(all_tools), llm.model_name, Priority.INTERACTIVE
+    )
+    response_llm = scheduled(llm, llm.model_name, Priority.INTERACTIVE)
 
     chain = prompt | llm_with_tools
 
-    llm_with_history = RunnableWithMessageHistory(
-        chain,
-        get_session_history=get_filtered_redis_history,
-        input_messages_key="input",
-        history_messages_key="history",
+    def chatbot(state: ChatBotState, config: RunnableConfig):
+        conversation_id = config["configurable"]["session_id"]
+        turn = current_turn(state.messages)
+        history = conversation_memory.load(
+            conversation_id, source=previous_messages(state.messages, turn)
+        )
+        response = chain.invoke({"history": history, "turn": turn}, config)
+        if not response.tool_calls:
+            history_store.append(conversation_id, [turn[0], response])
+            conversation_memory.schedule_summary(conversation_id)
+        return {"messages": [response]}
+
+    async def achatbot(state: ChatBotState, config: RunnableConfig):
+        conversation_id = config["configurable"]["session_id"]
+        turn = current_turn(state.messages)
+        history = await conversation_memory.aload(
+            conversation_id, source=previous_messages(state.messages, turn)
+        )
+        response = await chain.ainvoke({"history": history, "turn": turn}, config)
+        if not response.tool_calls:
+            await history_store.aappend(conversation_id, [turn[0], response])
+            conversation_memory.schedule_summary(conversation_id)
+        return {"messages": [response]}
+
+    synthesis_prompt = SystemMessage(
+        content="""You are a helpful assistant. Based on the tool results and conversation history, 
+        provide a clear, helpful response to the user. Synthesize the information from the tools 
+        into a natural, conversational response."""
     )
 
-    def chatbot(state: ChatBotState):
-        query = state.messages[-1].content
-        return {"messages": [llm_with_history.invoke({"input": query}, config=config)]}
+    def response_node(state: ChatBotState, config: RunnableConfig):
+        conversation_id = config["configurable"]["session_id"]
+        turn = current_turn(state.messages)
+        history = conversation_memory.load(
+            conversation_id, source=previous_messages(state.messages, turn)
+        )
+        context_messages = [synthesis_prompt] + history + turn
 
-    def response_node(state: ChatBotState):
-        dynamic_message = state.messages[-2]
+        ai_response = response_llm.invoke(context_messages, config=config)
 
-        if dynamic_message.type == "human":
-            return {"messages": []}
+        history_store.append(conversation_id, [turn[0], ai_response])
+        conversation_memory.schedule_summary(conversation_id)
+        return {"messages": [ai_response]}
 
-        synthesis_prompt = SystemMessage(
-            content="""You are a helpful assistant. Based on the tool results and conversation history, 
-        provide a clear, helpful response to the user. Synthesize the information from the tools 
-        into a natural, conversational response."""
+    async def aresponse_node(state: ChatBotState, config: RunnableConfig):
+        conversation_id = config["configurable"]["session_id"]
+        turn = current_turn(state.messages)
+        history = await conversation_memory.aload(
+            conversation_id, source=previous_messages(state.messages, turn)
         )
+        context_messages = [synthesis_prompt] + history + turn
 
-        context_messages = [synthesis_prompt] + state.messages
-
-        ai_response = llm.invoke(context_messages, config=config)
-
-        session_id = config["configurable"]["session_id"]
-        history = get_filtered_redis_history(session_id)
-        history.add_message(ai_response)
+        ai_response = await response_llm.ainvoke(context_messages, config=config)
 
+        await history_store.aappend(conversation_id, [turn[0], ai_response])
+        conversation_memory.schedule_summary(conversation_id)
         return {"messages": [ai_response]}
 
+    def route_tools(state: ChatBotState, config: RunnableConfig):
+        return "response" if synthesis_enabled(config) else "query"
+
     tools_node = ToolNode(tools=all_tools)
 
     rag_graph = StateGraph(ChatBotState)
 
-    rag_graph.add_node("query", chatbot)
+    rag_graph.add_node("query", RunnableLambda(chatbot, afunc=achatbot))
     rag_graph.add_node("tools", tools_node)
-    rag_graph.add_node("response", response_node)
+    rag_graph.add_node("response", RunnableLambda(response_node, afunc=aresponse_node))
 
     rag_graph.add_edge(START, "query")
 
@@ -156,19 +200,45 @@ def create_rag_agent(
         tools_condition,
         {
             "tools": "tools",
-            "__end__": "response",
+            "__end__": END,
         },
     )
 
     rag_graph.add_conditional_edges(
         "tools",
-        tools_condition,
+        route_tools,
         {
-            "tools": "tools",
-            "__end__": "response",
+            "query": "query",
+            "response": "response",
         },
     )
 
     rag_graph.add_edge("response", END)
 
     return rag_graph.compile(checkpointer=checkpoint)
+
+
+async def astream_chat_events(
+    chatbot, state: ChatBotState, config: RunnableConfig
+) -> AsyncIterator[tuple[str, dict]]:
+    """Run the agent and yield (event, data) pairs as they happen.
+
+    Emits "tool_start"/"tool_end" around tool calls and "token" for every
+    LLM content chunk. The final state is persisted by the checkpointer.
+    """
+    async for event in chatbot.astream_events(state, config=config, version="v2"):
+        kind = event["event"]
+        if kind == "on_chat_model_stream":
+            content = event["data"]["chunk"].content
+            if content:
+                yield "token", {
+                    "content": content,
+                    "node": event["metadata"].get("langgraph_node"),
+                }
+        elif kind == "on_tool_start":
+            yield "tool_start", {
+                "name": event["name"],
+                "input": event["data"].get("input"),
+            }
+        elif kind == "on_tool_end":
+            yield "tool_end", {"name": event["name"]}
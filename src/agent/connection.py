@@ -3,130 +3,291 @@ Database connection pool management for the application.
 This module is separate to avoid circular imports.
 """
 
+import asyncio
+import atexit
 import os
-from redis import Redis
+import threading
+from types import SimpleNamespace
+from redis import ConnectionPool as RedisConnectionPool, Redis
 from contextlib import contextmanager
 from dotenv import load_dotenv
 from langchain_openai import OpenAIEmbeddings
 from langgraph.checkpoint.postgres import PostgresSaver
-from psycopg_pool import ConnectionPool
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
 from langchain_postgres import PGVector
-from langchain_redis import RedisChatMessageHistory
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from src.agent.runtime import get_background_loop, run_in_background
 
 load_dotenv()
 embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
 
+TRANSCRIPT_COLLECTION = "Transcript_Vector"
+MESSAGE_COLLECTION = "Message_Vector"
+
+VECTOR_POOL_SIZE = int(os.getenv("VECTOR_POOL_SIZE", "5"))
+VECTOR_POOL_MAX_OVERFLOW = int(os.getenv("VECTOR_POOL_MAX_OVERFLOW", "10"))
+VECTOR_POOL_RECYCLE = int(os.getenv("VECTOR_POOL_RECYCLE", "1800"))
+
+_vector_lock = threading.Lock()
+_vector_engine: Engine | None = None
+_vectorstores: dict[str, "CachedCollectionPGVector"] = {}
+
+REDIS_POOL_MAX_CONNECTIONS = int(os.getenv("REDIS_POOL_MAX_CONNECTIONS", "50"))
+
+_redis_lock = threading.Lock()
+_redis_pool: RedisConnectionPool | None = None
+
+CHECKPOINT_POOL_MIN_SIZE = int(os.getenv("CHECKPOINT_POOL_MIN_SIZE", "1"))
+CHECKPOINT_POOL_MAX_SIZE = int(os.getenv("CHECKPOINT_POOL_MAX_SIZE", "10"))
+CHECKPOINT_POOL_MAX_IDLE = float(os.getenv("CHECKPOINT_POOL_MAX_IDLE", "300"))
+CHECKPOINT_POOL_MAX_LIFETIME = float(os.getenv("CHECKPOINT_POOL_MAX_LIFETIME", "3600"))
+CHECKPOINT_POOL_TIMEOUT = float(os.getenv("CHECKPOINT_POOL_TIMEOUT", "30"))
+
+_checkpoint_lock = threading.Lock()
+_checkpoint_pool: ConnectionPool | None = None
+_checkpointer: PostgresSaver | None = None
+_async_checkpoint_pool: AsyncConnectionPool | None = None
+
+
+class CachedCollectionPGVector(PGVector):
+    """PGVector that resolves its collection id once and reuses it for every query."""
+
+    _collection_cache = None
+
+    def get_collection(self, session):
+        if self._collection_cache is None:
+            collection = super().get_collection(session)
+            if collection is None:
+                return None
+            self._collection_cache = SimpleNamespace(
+                uuid=collection.uuid,
+                name=collection.name,
+                cmetadata=collection.cmetadata,
+            )
+        return self._collection_cache
+
+    @property
+    def collection_id(self):
+        if self._collection_cache is None:
+            with self._make_sync_session() as session:
+                self.get_collection(session)
+        return self._collection_cache.uuid
+
+
+def get_vector_engine() -> Engine:
+    """Get the pooled SQLAlchemy engine shared by every vectorstore."""
+    global _vector_engine
+    if _vector_engine is None:
+        with _vector_lock:
+            if _vector_engine is None:
+                _vector_engine = create_engine(
+                    os.getenv("DATABASE_URL"),
+                    pool_size=VECTOR_POOL_SIZE,
+                    max_overflow=VECTOR_POOL_MAX_OVERFLOW,
+                    pool_recycle=VECTOR_POOL_RECYCLE,
+                    pool_pre_ping=True,
+                )
+    return _vector_engine
+
+
+def _get_shared_vectorstore(collection_name: str) -> CachedCollectionPGVector:
+    vectorstore = _vectorstores.get(collection_name)
+    if vectorstore is None:
+        engine = get_vector_engine()
+        with _vector_lock:
+            vectorstore = _vectorstores.get(collection_name)
+            if vectorstore is None:
+                vectorstore = CachedCollectionPGVector(
+                    connection=engine,
+                    embeddings=embeddings,
+                    collection_name=collection_name,
+                    use_jsonb=True,
+                )
+                _vectorstores[collection_name] = vectorstore
+    return vectorstore
+
 
 @contextmanager
 def get_vectorstore_context():
-    """Create a per-request transcript vectorstore connection with automatic cleanup."""
-    vectorstore = None
-    try:
-        vectorstore = PGVector(
-            connection=os.getenv("DATABASE_URL"),
-            embeddings=embeddings,
-            collection_name="Transcript_Vector",
-            use_jsonb=True,
-        )
-        yield vectorstore
-    finally:
-        if (
-            vectorstore
-            and hasattr(vectorstore, "_connection")
-            and vectorstore._connection
-        ):
-            try:
-                vectorstore._connection.close()
-            except Exception as e:
-                print(f"Warning: Error closing vectorstore connection: {e}")
-
-
-def get_vectorstore():
-    return PGVector(
-        connection=os.getenv("DATABASE_URL"),
-        embeddings=embeddings,
-        collection_name="Transcript_Vector",
-        use_jsonb=True,
-    )
+    """Yield the shared transcript vectorstore."""
+    yield get_vectorstore()
+
+
+def get_vectorstore() -> CachedCollectionPGVector:
+    return _get_shared_vectorstore(TRANSCRIPT_COLLECTION)
 
 
 @contextmanager
 def get_messages_vectorstore():
-    """Create a per-request messages vectorstore connection with automatic cleanup."""
-    vectorstore = None
-    try:
-        vectorstore = PGVector(
-            connection=os.getenv("DATABASE_URL"),
-            embeddings=embeddings,
-            collection_name="Message_Vector",
-            use_jsonb=True,
-        )
-        yield vectorstore
-    finally:
-        if (
-            vectorstore
-            and hasattr(vectorstore, "_connection")
-            and vectorstore._connection
-        ):
-            try:
-                vectorstore._connection.close()
-            except Exception as e:
-                print(f"Warning: Error closing messages vectorstore connection: {e}")
+    """Yield the shared messages vectorstore."""
+    yield _get_shared_vectorstore(MESSAGE_COLLECTION)
+
+
+def warm_vectorstores():
+    """Create the shared vectorstores and resolve their collection ids up front."""
+    for collection_name in (TRANSCRIPT_COLLECTION, MESSAGE_COLLECTION):
+        _get_shared_vectorstore(collection_name).collection_id
+
+
+def close_vectorstores():
+    """Dispose the shared vectorstore engine. Registered to run at interpreter exit."""
+    global _vector_engine
+    with _vector_lock:
+        engine = _vector_engine
+        _vector_engine = None
+        _vectorstores.clear()
+    if engine is not None:
+        try:
+            engine.dispose()
+        except Exception as e:
+            print(f"Warning: Error disposing vectorstore engine: {e}")
+
+
+atexit.register(close_vectorstores)
+
+
+def _checkpoint_pool_kwargs():
+    return {
+        "autocommit": True,
+        "prepare_threshold": 0,
+        "row_factory": dict_row,
+    }
+
+
+def get_checkpoint_pool() -> ConnectionPool:
+    """Get the application-lifetime connection pool used by the checkpointer."""
+    global _checkpoint_pool
+    if _checkpoint_pool is None:
+        with _checkpoint_lock:
+            if _checkpoint_pool is None:
+                _checkpoint_pool = ConnectionPool(
+                    conninfo=os.getenv("DATABASE_URL"),
+                    min_size=CHECKPOINT_POOL_MIN_SIZE,
+                    max_size=CHECKPOINT_POOL_MAX_SIZE,
+                    max_idle=CHECKPOINT_POOL_MAX_IDLE,
+                    max_lifetime=CHECKPOINT_POOL_MAX_LIFETIME,
+                    timeout=CHECKPOINT_POOL_TIMEOUT,
+                    check=ConnectionPool.check_connection,
+                    kwargs=_checkpoint_pool_kwargs(),
+                    open=True,
+                )
+    return _checkpoint_pool
+
+
+def get_checkpointer() -> PostgresSaver:
+    """Get the shared PostgresSaver backed by the application connection pool."""
+    global _checkpointer
+    if _checkpointer is None:
+        pool = get_checkpoint_pool()
+        with _checkpoint_lock:
+            if _checkpointer is None:
+                _checkpointer = PostgresSaver(pool)
+    return _checkpointer
 
 
 @contextmanager
 def get_checkpoint():
-    """Create a per-request PostgresSaver instance with automatic cleanup.
+    """Yield the shared PostgresSaver.
 
-    This creates a fresh PostgresSaver for each request to avoid long-running sessions.
+    Connections are borrowed from the application-lifetime pool per operation,
+    so nothing needs to be torn down when the request finishes.
     """
-    connection_pool = None
-    checkpoint = None
-    try:
-        connection_pool = ConnectionPool(
+    yield get_checkpointer()
+
+
+async def get_async_checkpoint_pool() -> AsyncConnectionPool:
+    """Get the application-lifetime async checkpoint pool.
+
+    Async connections and the pool's maintenance tasks are bound to the loop
+    that opened them, so the pool lives on the background loop and must not
+    be used from Flask's per-request loops.
+    """
+    global _async_checkpoint_pool
+    if asyncio.get_running_loop() is not get_background_loop():
+        raise RuntimeError(
+            "The async checkpoint pool is only available on the background loop"
+        )
+    # Only the background loop touches the pool, no lock needed.
+    if _async_checkpoint_pool is None:
+        _async_checkpoint_pool = AsyncConnectionPool(
             conninfo=os.getenv("DATABASE_URL"),
-            min_size=1,
-            max_size=2,
+            min_size=CHECKPOINT_POOL_MIN_SIZE,
+            max_size=CHECKPOINT_POOL_MAX_SIZE,
+            max_idle=CHECKPOINT_POOL_MAX_IDLE,
+            max_lifetime=CHECKPOINT_POOL_MAX_LIFETIME,
+            timeout=CHECKPOINT_POOL_TIMEOUT,
+            check=AsyncConnectionPool.check_connection,
+            kwargs=_checkpoint_pool_kwargs(),
+            open=False,
         )
-        checkpoint = PostgresSaver(connection_pool)
-        yield checkpoint
-    finally:
-        if connection_pool:
-            try:
-                connection_pool.close()
-            except Exception as e:
-                print(f"Warning: Error closing checkpoint connection pool: {e}")
+    await _async_checkpoint_pool.open()
+    return _async_checkpoint_pool
 
 
-@contextmanager
-def get_redis_client():
-    """Create a per-request Redis client connection with automatic cleanup."""
-    redis_client = None
+def close_async_checkpoint_pool():
+    """Close the async checkpoint pool on the background loop. Registered to
+    run at interpreter exit."""
+    global _async_checkpoint_pool
+    pool = _async_checkpoint_pool
+    _async_checkpoint_pool = None
+    if pool is None:
+        return
     try:
-        redis_client = Redis(host=os.getenv("REDIS_HOST"), port=os.getenv("REDIS_PORT"))
-        yield redis_client
-    finally:
-        if redis_client:
-            redis_client.close()
+        run_in_background(pool.close()).result(timeout=CHECKPOINT_POOL_TIMEOUT)
+    except Exception as e:
+        print(f"Warning: Error closing async checkpoint connection pool: {e}")
+
+
+atexit.register(close_async_checkpoint_pool)
+
+
+def close_checkpoint_pool():
+    """Close the shared checkpoint pool. Registered to run at interpreter exit."""
+    global _checkpoint_pool, _checkpointer
+    with _checkpoint_lock:
+        pool = _checkpoint_pool
+        _checkpoint_pool = None
+        _checkpointer = None
+    if pool is not None:
+        try:
+            pool.close()
+        except Exception as e:
+            print(f"Warning: Error closing checkpoint connection pool: {e}")
+
+
+atexit.register(close_checkpoint_pool)
+
+
+def get_redis() -> Redis:
+    """Get a Redis client backed by the process-wide connection pool."""
+    global _redis_pool
+    if _redis_pool is None:
+        with _redis_lock:
+            if _redis_pool is None:
+                _redis_pool = RedisConnectionPool(
+                    host=os.getenv("REDIS_HOST"),
+                    port=int(os.getenv("REDIS_PORT", "6379")),
+                    max_connections=REDIS_POOL_MAX_CONNECTIONS,
+                    health_check_interval=30,
+                )
+    return Redis(connection_pool=_redis_pool)
 
 
 @contextmanager
-def get_redis_history_context(conversation_id: str):
-    """Create a per-request Redis client connection with automatic cleanup."""
+def get_redis_client():
+    """Yield a Redis client from the shared connection pool."""
     redis_client = None
     try:
-        redis_client = Redis(host=os.getenv("REDIS_HOST"), port=os.getenv("REDIS_PORT"))
-        redis_history = RedisChatMessageHistory(
-            session_id=conversation_id, redis_client=redis_client
-        )
-        yield redis_history
+        redis_client = get_redis()
+        yield redis_client
     finally:
         if redis_client:
             redis_client.close()
 
 
-def get_redis_history(conversation_id: str):
-    redis_client = Redis(host=os.getenv("REDIS_HOST"), port=os.getenv("REDIS_PORT"))
-    return RedisChatMessageHistory(
-        session_id=conversation_id, redis_client=redis_client
-    )
+def warm_connections():
+    """Open the shared pools and vectorstores so the first request does not pay for it."""
+    get_checkpoint_pool()
+    warm_vectorstores()
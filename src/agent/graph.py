@@ -1,8 +1,11 @@
 from langgraph.graph import StateGraph, START, END
 
 from src.agent.nodes import (
+    assemble_node,
     create_questions_node,
     load_transcript_node,
+    pre_clean_condition_node,
+    pre_clean_node,
     clean_transcript_node,
     quality_score_condition_node,
     quality_check_node,
@@ -16,22 +19,36 @@ from src.agent.state import TranscriptState
 transcript_builder = StateGraph(TranscriptState)
 
 transcript_builder.add_node("load_transcript", load_transcript_node)
+transcript_builder.add_node("pre_clean", pre_clean_node)
 transcript_builder.add_node("clean_transcript", clean_transcript_node)
 transcript_builder.add_node("quality_check", quality_check_node)
 transcript_builder.add_node("split_transcript", split_transcript_node)
 transcript_builder.add_node("identify_participants", identify_participants_node)
 transcript_builder.add_node("identify_topics", identify_topics_node)
 transcript_builder.add_node("create_questions", create_questions_node)
+transcript_builder.add_node("assemble", assemble_node)
 
 transcript_builder.add_edge(START, "load_transcript")
-transcript_builder.add_edge("load_transcript", "clean_transcript")
+transcript_builder.add_edge("load_transcript", "pre_clean")
 transcript_builder.add_edge("clean_transcript", "quality_check")
 transcript_builder.add_edge("split_transcript", "identify_participants")
 transcript_builder.add_edge("split_transcript", "identify_topics")
 transcript_builder.add_edge("split_transcript", "create_questions")
 
-transcript_builder.add_edge("identify_participants", END)
-transcript_builder.add_edge("identify_topics", END)
+# All three branches run in the same superstep; assemble waits for every one.
+transcript_builder.add_edge(
+    ["identify_participants", "identify_topics", "create_questions"], "assemble"
+)
+transcript_builder.add_edge("assemble", END)
+
+transcript_builder.add_conditional_edges(
+    "pre_clean",
+    pre_clean_condition_node,
+    {
+        "clean": "clean_transcript",
+        "skip": "split_transcript",
+    },
+)
 
 transcript_builder.add_conditional_edges(
     "quality_check",
@@ -0,0 +1,181 @@
+"""
+Conversation history store.
+
+The LangGraph checkpoint is the source of truth for a conversation's
+messages. Redis holds a write-through cache of the last HISTORY_CACHE_SIZE
+visible messages (human messages and final AI answers, no tool traffic) so
+chat prompts and conversation reads never deserialize the whole checkpoint.
+A missing Redis key is a cache miss and is warmed from the checkpoint.
+"""
+
+import asyncio
+import json
+import os
+from typing import List, Optional, Sequence, Tuple
+from dotenv import load_dotenv
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from src.agent.connection import get_checkpointer, get_redis
+
+load_dotenv()
+
+HISTORY_CACHE_SIZE = int(os.getenv("HISTORY_CACHE_SIZE", "50"))
+HISTORY_CACHE_TTL = int(os.getenv("HISTORY_CACHE_TTL", str(7 * 24 * 3600)))
+HISTORY_KEY_PREFIX = "chat:history:"
+
+
+def is_visible(message: BaseMessage) -> bool:
+    """Human messages and AI answers; tool calls and tool results are internal."""
+    if message.type == "human":
+        return True
+    return message.type == "ai" and not getattr(message, "tool_calls", None)
+
+
+def visible_messages(messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+    return [message for message in messages if is_visible(message)]
+
+
+def _dumps(message: BaseMessage) -> str:
+    return json.dumps(message_to_dict(message))
+
+
+def _loads(payloads: Sequence[bytes]) -> List[BaseMessage]:
+    return messages_from_dict([json.loads(payload) for payload in payloads])
+
+
+class ConversationHistoryStore:
+    def __init__(
+        self, max_messages: int = HISTORY_CACHE_SIZE, ttl: int = HISTORY_CACHE_TTL
+    ):
+        self.max_messages = max_messages
+        self.ttl = ttl
+
+    def _key(self, conversation_id: str) -> str:
+        return f"{HISTORY_KEY_PREFIX}{conversation_id}"
+
+    def load_from_checkpoint(self, conversation_id: str) -> List[BaseMessage]:
+        checkpoint = get_checkpointer().get(
+            {"configurable": {"thread_id": conversation_id, "checkpoint_ns": ""}}
+        )
+        if not checkpoint:
+            return []
+        return visible_messages(checkpoint["channel_values"].get("messages", []))
+
+    def warm(self, conversation_id: str, messages: Sequence[BaseMessage]) -> None:
+        """Replace the cached history with the latest visible messages."""
+        key = self._key(conversation_id)
+        recent = visible_messages(messages)[-self.max_messages :]
+        pipeline = get_redis().pipeline()
+        pipeline.delete(key)
+        if recent:
+            pipeline.rpush(key, *[_dumps(message) for message in recent])
+            pipeline.expire(key, self.ttl)
+        pipeline.execute()
+
+    def messages(
+        self,
+        conversation_id: str,
+        source: Optional[Sequence[BaseMessage]] = None,
+    ) -> List[BaseMessage]:
+        """
+        Get the cached visible messages, oldest first. On a cache miss the
+        cache is warmed from `source` when the caller already holds the
+        conversation's messages, otherwise from the checkpoint.
+        """
+        key = self._key(conversation_id)
+        pipeline = get_redis().pipeline(transaction=False)
+        pipeline.exists(key)
+        pipeline.lrange(key, -self.max_messages, -1)
+        exists, payloads = pipeline.execute()
+        if exists:
+            return _loads(payloads)
+
+        messages = visible_messages(
+            source if source is not None else self.load_from_checkpoint(conversation_id)
+        )[-self.max_messages :]
+        if messages:
+            self.warm(conversation_id, messages)
+        return messages
+
+    def tail(
+        self, conversation_id: str, count: int, offset: int = 0
+    ) -> Optional[List[BaseMessage]]:
+        """
+        Read up to `count` cached messages ending `offset` messages before the
+        newest one, oldest first, with a single LRANGE. Returns None on a
+        cache miss.
+        """
+        key = self._key(conversation_id)
+        end = -1 - offset
+        pipeline = get_redis().pipeline(transaction=False)
+        pipeline.exists(key)
+        pipeline.lrange(key, end - count + 1, end)
+        # Reads keep an active conversation's cache alive.
+        pipeline.expire(key, self.ttl)
+        exists, payloads, _ = pipeline.execute()
+        if not exists:
+            return None
+        return _loads(payloads)
+
+    def page(
+        self, conversation_id: str, limit: int, offset: int = 0
+    ) -> Tuple[List[BaseMessage], bool]:
+        """
+        Get `limit` visible messages ending `offset` messages before the
+        newest, oldest first, and whether older messages exist. Pages inside
+        the cached window are one LRANGE; older pages read the checkpoint.
+        """
+        in_cache = offset + limit < self.max_messages
+        if in_cache:
+            # One extra message tells whether an older page exists.
+            cached = self.tail(conversation_id, limit + 1, offset)
+            if cached is not None:
+                return cached[-limit:], len(cached) > limit
+
+        messages = self.load_from_checkpoint(conversation_id)
+        if in_cache and messages:
+            # Cache miss: warm the cache with one RPUSH.
+            self.warm(conversation_id, messages)
+        end = len(messages) - offset
+        if end <= 0:
+            return [], False
+        start = max(end - limit, 0)
+        return messages[start:end], start > 0
+
+    def append(self, conversation_id: str, messages: Sequence[BaseMessage]) -> None:
+        """
+        Write new messages through to the cache. RPUSHX only appends to an
+        existing list, so a cold cache is never left holding a partial history;
+        the next read warms it from the checkpoint instead.
+        """
+        messages = visible_messages(messages)
+        if not messages:
+            return
+        key = self._key(conversation_id)
+        pipeline = get_redis().pipeline()
+        pipeline.rpushx(key, *[_dumps(message) for message in messages])
+        pipeline.ltrim(key, -self.max_messages, -1)
+        pipeline.expire(key, self.ttl)
+        pipeline.execute()
+
+    def clear(self, conversation_id: str) -> None:
+        get_redis().delete(self._key(conversation_id))
+
+    async def amessages(
+        self,
+        conversation_id: str,
+        source: Optional[Sequence[BaseMessage]] = None,
+    ) -> List[BaseMessage]:
+        return await asyncio.to_thread(self.messages, conversation_id, source)
+
+    async def apage(
+        self, conversation_id: str, limit: int, offset: int = 0
+    ) -> Tuple[List[BaseMessage], bool]:
+        return await asyncio.to_thread(self.page, conversation_id, limit, offset)
+
+    async def aappend(
+        self, conversation_id: str, messages: Sequence[BaseMessage]
+    ) -> None:
+        await asyncio.to_thread(self.append, conversation_id, messages)
+
+
+history_store = ConversationHistoryStore()
@@ -0,0 +1,147 @@
+"""
+Embedding and vector indexing stage for transcript chunks.
+
+Chunks are embedded in provider-sized batches with bounded concurrency,
+embeddings are cached by chunk hash, and the resulting vectors are written
+to the PGVector table with a single COPY. Blocking work runs in threads so
+the event loop stays free.
+"""
+
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import os
+import uuid
+from typing import List
+from src.agent.cache import create_cache
+from src.agent.connection import embeddings, get_vector_engine, get_vectorstore
+from src.agent.utils import gather_bounded
+
+# OpenAI accepts up to 2048 inputs per embeddings request.
+EMBEDDING_BATCH_SIZE = min(int(os.getenv("EMBEDDING_BATCH_SIZE", "512")), 2048)
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "2"))
+EMBEDDING_CACHE_TTL = int(os.getenv("EMBEDDING_CACHE_TTL", str(30 * 24 * 3600)))
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+
+embedding_cache = create_cache(
+    "embedding", max_size=EMBEDDING_CACHE_SIZE, ttl=EMBEDDING_CACHE_TTL
+)
+
+
+def chunk_hash(text: str) -> str:
+    """Hash a chunk together with the embedding model that embeds it."""
+    raw = f"{embeddings.model}\x00{text}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _batched(items: List, size: int) -> List[List]:
+    return [items[index : index + size] for index in range(0, len(items), size)]
+
+
+async def embed_texts(texts: List[str]) -> List[List[float]]:
+    """Embed texts, skipping any text whose embedding is already cached."""
+    hashes = [chunk_hash(text) for text in texts]
+
+    def read_cache():
+        cached = {}
+        for key in set(hashes):
+            payload = embedding_cache.get(key)
+            if payload is not None:
+                cached[key] = json.loads(payload)
+        return cached
+
+    vectors = await asyncio.to_thread(read_cache)
+
+    missing = {}
+    for key, text in zip(hashes, texts):
+        if key not in vectors:
+            missing.setdefault(key, text)
+    missing_keys = list(missing)
+
+    async def embed_batch(batch_keys: List[str]):
+        batch_texts = [missing[key] for key in batch_keys]
+        batch_vectors = await asyncio.to_thread(embeddings.embed_documents, batch_texts)
+        return list(zip(batch_keys, batch_vectors))
+
+    batches = await gather_bounded(
+        _batched(missing_keys, EMBEDDING_BATCH_SIZE), embed_batch, EMBEDDING_CONCURRENCY
+    )
+    embedded = {key: vector for batch in batches for key, vector in batch}
+
+    def write_cache():
+        for key, vector in embedded.items():
+            embedding_cache.set(key, json.dumps(vector))
+
+    if embedded:
+        await asyncio.to_thread(write_cache)
+        vectors.update(embedded)
+
+    return [vectors[key] for key in hashes]
+
+
+def _format_vector(vector: List[float]) -> str:
+    return "[" + ",".join(str(value) for value in vector) + "]"
+
+
+def _csv_rows(
+    texts: List[str], vectors: List[List[float]], metadatas: List[dict], collection_id
+) -> io.StringIO:
+    buffer = io.StringIO()
+    # Quote every field, an unquoted empty field would be read as NULL.
+    writer = csv.writer(buffer, quoting=csv.QUOTE_ALL, lineterminator="\n")
+    for text, vector, metadata in zip(texts, vectors, metadatas):
+        writer.writerow(
+            (
+                str(uuid.uuid4()),
+                str(collection_id),
+                _format_vector(vector),
+                text,
+                json.dumps(metadata),
+            )
+        )
+    buffer.seek(0)
+    return buffer
+
+
+def copy_vectors(texts: List[str], vectors: List[List[float]], metadatas: List[dict]):
+    """
+    Bulk insert vectors into the transcript collection with COPY, on a
+    connection from the vectorstore's own SQLAlchemy pool.
+    """
+    vectorstore = get_vectorstore()
+    table = vectorstore.EmbeddingStore.__tablename__
+    rows = _csv_rows(texts, vectors, metadatas, vectorstore.collection_id)
+    sql = (
+        f"COPY {table} (id, collection_id, embedding, document, cmetadata) "
+        "FROM STDIN WITH (FORMAT csv)"
+    )
+
+    engine = get_vector_engine()
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        try:
+            # DATABASE_URL picks the driver, psycopg2 and psycopg differ on COPY.
+            if engine.dialect.driver == "psycopg2":
+                cursor.copy_expert(sql, rows)
+            else:
+                with cursor.copy(sql) as copy:
+                    copy.write(rows.getvalue())
+        finally:
+            cursor.close()
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+
+async def index_chunks(chunks: List[str], metadatas: List[dict]):
+    """Embed chunks and write them to the transcript vectorstore."""
+    if not chunks:
+        return
+    vectors = await embed_texts(chunks)
+    await asyncio.to_thread(copy_vectors, chunks, vectors, metadatas)
@@ -0,0 +1,263 @@
+"""
+Transcript file loaders.
+
+Loaders are registered by file extension and return plain "Speaker: text"
+lines, with timestamps, cue numbers and markup stripped in code. Consecutive
+lines from the same speaker are merged into one turn.
+
+DOCX files are read natively: word/document.xml is streamed out of the zip
+archive and parsed paragraph by paragraph, so large transcripts never build
+a full element tree. WebVTT, SRT, Teams JSON and plain text have their own
+parsers. Anything else falls back to Unstructured.
+
+A transcript counts as structured when nearly every line carries a speaker
+label; the graph skips the LLM clean for those.
+"""
+
+import json
+import os
+import re
+import zipfile
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from xml.etree.ElementTree import iterparse
+from pydantic import BaseModel
+from src.agent.utils import SPEAKER_PATTERN
+
+STRUCTURED_SPEAKER_RATIO = float(os.getenv("STRUCTURED_SPEAKER_RATIO", "0.8"))
+
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+PARAGRAPH = f"{WORD_NAMESPACE}p"
+TEXT = f"{WORD_NAMESPACE}t"
+TAB = f"{WORD_NAMESPACE}tab"
+BREAKS = {f"{WORD_NAMESPACE}br", f"{WORD_NAMESPACE}cr"}
+
+# "Hunter Freeland   0:06" or "Hunter Freeland   1:02:33"
+TEAMS_HEADER_PATTERN = re.compile(
+    r"^(?P<speaker>\S.*?)\s{2,}(?:\d{1,2}:)?\d{1,2}:\d{2}$"
+)
+# "00:00:01.000 --> 00:00:04.000 align:start" (VTT) or "00:00:01,000 --> ..." (SRT)
+CUE_TIMING_PATTERN = re.compile(r"^(?:\d+:)?\d{1,2}:\d{2}[.,]\d{3}\s+-->")
+# "[00:01:02]", "(1:02)" or "00:01:02 -" at the start of a line
+LEADING_TIMESTAMP_PATTERN = re.compile(
+    r"^[\[(]?(?:\d{1,2}:)?\d{1,2}:\d{2}(?:[.,]\d+)?[\])]?\s*[-–]?\s*"
+)
+VOICE_TAG_PATTERN = re.compile(r"<v(?:\.[\w.]+)?\s+([^>]+)>")
+MARKUP_PATTERN = re.compile(r"<[^>]+>")
+
+Turn = Tuple[Optional[str], str]
+
+
+class LoadedTranscript(BaseModel):
+    text: str
+    structured: bool = False
+
+
+def normalize_speaker(speaker: str) -> str:
+    speaker = re.sub(r"\s+", " ", speaker).strip()
+    return speaker.rstrip(":").strip()
+
+
+def split_speaker(line: str) -> Turn:
+    """Split a "Speaker: text" line. Lines without a label have no speaker."""
+    match = SPEAKER_PATTERN.match(line)
+    if not match:
+        return None, line.strip()
+    return normalize_speaker(match.group(1)), line[match.end() :].strip()
+
+
+def format_turns(turns: List[Turn]) -> str:
+    """Join turns as "Speaker: text" lines, merging consecutive same-speaker turns."""
+    merged: List[Turn] = []
+    for speaker, text in turns:
+        text = re.sub(r"\s+", " ", text).strip()
+        if not text:
+            continue
+        if merged and speaker and merged[-1][0] == speaker:
+            merged[-1] = (speaker, f"{merged[-1][1]} {text}")
+        else:
+            merged.append((speaker, text))
+    return "\n".join(f"{speaker}: {text}" if speaker else text for speaker, text in merged)
+
+
+def is_structured(text: str) -> bool:
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return False
+    labelled = sum(1 for line in lines if SPEAKER_PATTERN.match(line))
+    return labelled / len(lines) >= STRUCTURED_SPEAKER_RATIO
+
+
+def _read_text(file_path: str) -> str:
+    with open(file_path, encoding="utf-8-sig", errors="replace") as file:
+        return file.read()
+
+
+def iter_docx_paragraphs(file_path: str) -> Iterator[str]:
+    """Stream paragraph text from a DOCX file. Line breaks are kept as newlines.
+
+    Paragraphs nested in text boxes or content controls are yielded on their
+    own and do not interrupt the enclosing paragraph. Finished elements are
+    detached from the tree as parsing goes, so memory stays flat.
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        with archive.open("word/document.xml") as document:
+            open_elements: List = []
+            paragraphs: List[List[str]] = []
+            for event, element in iterparse(document, events=("start", "end")):
+                if event == "start":
+                    open_elements.append(element)
+                    if element.tag == PARAGRAPH:
+                        paragraphs.append([])
+                    continue
+
+                open_elements.pop()
+                if element.tag == PARAGRAPH:
+                    yield "".join(paragraphs.pop())
+                elif paragraphs:
+                    if element.tag == TEXT:
+                        paragraphs[-1].append(element.text or "")
+                    elif element.tag == TAB:
+                        paragraphs[-1].append("\t")
+                    elif element.tag in BREAKS:
+                        paragraphs[-1].append("\n")
+
+                if not paragraphs and open_elements:
+                    open_elements[-1].remove(element)
+
+
+def paragraph_turn(paragraph: str) -> Turn:
+    """Read a Teams turn ("Name   0:06" + lines) or a "Name: text" paragraph."""
+    lines = [line.strip() for line in paragraph.split("\n")]
+    lines = [line for line in lines if line]
+    if not lines:
+        return None, ""
+
+    match = TEAMS_HEADER_PATTERN.match(lines[0])
+    if match and len(lines) > 1:
+        return normalize_speaker(match.group("speaker")), " ".join(lines[1:])
+    return split_speaker(" ".join(lines))
+
+
+def load_docx(file_path: str) -> str:
+    return format_turns([paragraph_turn(p) for p in iter_docx_paragraphs(file_path)])
+
+
+def _cue_turns(blocks: List[List[str]]) -> List[Turn]:
+    """Read cue text as turns. Captions usually label only the first line of a
+    speaker's turn, so a speaker carries over to later lines and cues."""
+    turns: List[Turn] = []
+    speaker = None
+    for block in blocks:
+        timing = next(
+            (i for i, line in enumerate(block) if CUE_TIMING_PATTERN.match(line)), None
+        )
+        if timing is None:
+            continue
+        for line in block[timing + 1 :]:
+            voice = VOICE_TAG_PATTERN.search(line)
+            text = MARKUP_PATTERN.sub("", line).strip()
+            if voice:
+                line_speaker = normalize_speaker(voice.group(1))
+            else:
+                line_speaker, text = split_speaker(text)
+            if line_speaker:
+                speaker = line_speaker
+            turns.append((speaker, text))
+    return turns
+
+
+def _blocks(text: str) -> List[List[str]]:
+    blocks = re.split(r"\n\s*\n", text.replace("\r\n", "\n"))
+    return [[line.strip() for line in block.strip().split("\n")] for block in blocks]
+
+
+def load_vtt(file_path: str) -> str:
+    # Header, NOTE, STYLE and REGION blocks have no cue timing line and are skipped.
+    return format_turns(_cue_turns(_blocks(_read_text(file_path))))
+
+
+def load_srt(file_path: str) -> str:
+    return format_turns(_cue_turns(_blocks(_read_text(file_path))))
+
+
+def _json_entries(data) -> List[dict]:
+    if isinstance(data, list):
+        return [entry for entry in data if isinstance(entry, dict)]
+    if isinstance(data, dict):
+        for key in ("entries", "transcript", "segments", "results"):
+            if isinstance(data.get(key), list):
+                return _json_entries(data[key])
+    return []
+
+
+def load_teams_json(file_path: str) -> str:
+    """Load a Teams/Stream JSON export: a list of entries with speaker and text."""
+    data = json.loads(_read_text(file_path))
+    turns: List[Turn] = []
+    for entry in _json_entries(data):
+        speaker = (
+            entry.get("speakerDisplayName")
+            or entry.get("speakerName")
+            or entry.get("speaker")
+        )
+        text = entry.get("text") or entry.get("content") or ""
+        if speaker:
+            turns.append((normalize_speaker(str(speaker)), str(text)))
+        else:
+            turns.append(split_speaker(str(text)))
+    return format_turns(turns)
+
+
+def load_txt(file_path: str) -> str:
+    """Load plain text, handling both "Name: text" and Teams "Name   0:06" headers."""
+    turns: List[Turn] = []
+    speaker = None
+    for line in _read_text(file_path).splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        header = TEAMS_HEADER_PATTERN.match(line)
+        if header:
+            speaker = normalize_speaker(header.group("speaker"))
+            continue
+        line_speaker, text = split_speaker(LEADING_TIMESTAMP_PATTERN.sub("", line))
+        if line_speaker:
+            speaker = line_speaker
+        turns.append((speaker, text))
+    return format_turns(turns)
+
+
+def load_with_unstructured(file_path: str, file_name: str) -> str:
+    # Imported lazily: Unstructured pulls in a large import graph that the
+    # native loaders never need.
+    from langchain_unstructured.document_loaders import UnstructuredLoader
+
+    loader = UnstructuredLoader(file_path=file_path, metadata_filename=file_name)
+    documents = loader.load()
+    return "\n".join([doc.page_content for doc in documents])
+
+
+LOADERS: Dict[str, Callable[[str], str]] = {
+    ".docx": load_docx,
+    ".vtt": load_vtt,
+    ".srt": load_srt,
+    ".json": load_teams_json,
+    ".txt": load_txt,
+}
+
+
+def register_loader(extension: str, loader: Callable[[str], str]) -> None:
+    LOADERS[extension.lower()] = loader
+
+
+def load_transcript(file_path: str, file_name: str) -> LoadedTranscript:
+    """Load transcript text with the loader registered for the file extension."""
+    extension = os.path.splitext(file_name or file_path)[1].lower()
+    loader = LOADERS.get(extension)
+    if loader is not None:
+        try:
+            text = loader(file_path)
+            return LoadedTranscript(text=text, structured=is_structured(text))
+        except (zipfile.BadZipFile, KeyError, ValueError, UnicodeError) as e:
+            print(f"Warning: {extension} loader failed, using Unstructured: {e}")
+    return LoadedTranscript(text=load_with_unstructured(file_path, file_name))
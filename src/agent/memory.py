@@ -0,0 +1,206 @@
+"""
+Windowed and summarized conversation memory for chat prompts.
+
+A prompt gets the most recent messages that fit in MEMORY_TOKEN_BUDGET,
+read from the tail of the cached history a page at a time with LRANGE, plus
+a rolling summary of the messages that have fallen out of that window. The
+summary is updated incrementally on the background loop after a turn, so no
+chat request waits on it.
+"""
+
+import asyncio
+import json
+import os
+import threading
+from typing import List, Optional, Sequence
+from dotenv import load_dotenv
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_openai import ChatOpenAI
+from src.agent.connection import get_redis
+from src.agent.history import ConversationHistoryStore, history_store
+from src.agent.preclean import count_tokens
+from src.agent.prompts import ChatBotPrompts
+from src.agent.runtime import run_in_background
+from src.agent.scheduler import scheduled
+
+load_dotenv()
+
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "2000"))
+MEMORY_WINDOW_PAGE = int(os.getenv("MEMORY_WINDOW_PAGE", "10"))
+MEMORY_SUMMARY_ENABLED = os.getenv("MEMORY_SUMMARY_ENABLED", "true").lower() == "true"
+MEMORY_SUMMARY_MAX_TOKENS = int(os.getenv("MEMORY_SUMMARY_MAX_TOKENS", "300"))
+SUMMARY_KEY_PREFIX = "chat:summary:"
+# Rough per-message overhead of role and formatting tokens.
+MESSAGE_TOKEN_OVERHEAD = 4
+
+summary_llm = ChatOpenAI(
+    model="gpt-4o-mini", temperature=0, max_completion_tokens=MEMORY_SUMMARY_MAX_TOKENS
+)
+# Summaries are background work and yield to interactive chat calls.
+scheduled_summary_llm = scheduled(summary_llm, summary_llm.model_name)
+
+
+def message_tokens(message: BaseMessage) -> int:
+    return count_tokens(str(message.content)) + MESSAGE_TOKEN_OVERHEAD
+
+
+def _message_id(message: BaseMessage) -> Optional[str]:
+    return message.id or message.additional_kwargs.get("id")
+
+
+def take_window(messages: Sequence[BaseMessage], token_budget: int) -> List[BaseMessage]:
+    """The newest messages that fit in token_budget, oldest first. The newest
+    message is always kept, even when it alone exceeds the budget."""
+    window = []
+    tokens = 0
+    for message in reversed(messages):
+        cost = message_tokens(message)
+        if window and tokens + cost > token_budget:
+            break
+        window.append(message)
+        tokens += cost
+    return list(reversed(window))
+
+
+class ConversationMemory:
+    def __init__(
+        self,
+        store: ConversationHistoryStore,
+        token_budget: int = MEMORY_TOKEN_BUDGET,
+        page_size: int = MEMORY_WINDOW_PAGE,
+    ):
+        self.store = store
+        self.token_budget = token_budget
+        self.page_size = max(page_size, 1)
+        self._updating: set[str] = set()
+        self._lock = threading.Lock()
+
+    def _summary_key(self, conversation_id: str) -> str:
+        return f"{SUMMARY_KEY_PREFIX}{conversation_id}"
+
+    def window(
+        self,
+        conversation_id: str,
+        source: Optional[Sequence[BaseMessage]] = None,
+    ) -> List[BaseMessage]:
+        """Read the token-budgeted window from the cache tail, page by page."""
+        window = []
+        tokens = 0
+        offset = 0
+        while offset < self.store.max_messages:
+            page = self.store.tail(conversation_id, self.page_size, offset)
+            if page is None:
+                messages = self.store.messages(conversation_id, source)
+                return take_window(messages, self.token_budget)
+
+            for message in reversed(page):
+                cost = message_tokens(message)
+                if window and tokens + cost > self.token_budget:
+                    return list(reversed(window))
+                window.append(message)
+                tokens += cost
+
+            if len(page) < self.page_size:
+                break
+            offset += self.page_size
+        return list(reversed(window))
+
+    def summary(self, conversation_id: str) -> Optional[dict]:
+        payload = get_redis().get(self._summary_key(conversation_id))
+        return json.loads(payload) if payload else None
+
+    def load(
+        self,
+        conversation_id: str,
+        source: Optional[Sequence[BaseMessage]] = None,
+    ) -> List[BaseMessage]:
+        """Prompt history: the rolling summary, if any, followed by the window."""
+        window = self.window(conversation_id, source)
+        summary = self.summary(conversation_id) if MEMORY_SUMMARY_ENABLED else None
+        if not summary or not summary.get("summary"):
+            return window
+        context = SystemMessage(content=ChatBotPrompts.summary_context(summary["summary"]))
+        return [context] + window
+
+    async def aload(
+        self,
+        conversation_id: str,
+        source: Optional[Sequence[BaseMessage]] = None,
+    ) -> List[BaseMessage]:
+        return await asyncio.to_thread(self.load, conversation_id, source)
+
+    def update_summary(self, conversation_id: str) -> None:
+        """Fold messages that have left the window into the rolling summary.
+
+        The cache only holds the last HISTORY_CACHE_SIZE messages. When older
+        messages may still be unsummarized (no summary yet on a full cache,
+        or the last summarized message was trimmed after skipped or expired
+        updates), the full history is read from the checkpoint instead.
+        """
+        current = self.summary(conversation_id) or {}
+        last_id = current.get("last_id")
+        messages = self.store.tail(conversation_id, self.store.max_messages)
+        ids = [_message_id(message) for message in messages or []]
+        if (
+            messages is None
+            or (last_id and last_id not in ids)
+            or (not last_id and len(messages) >= self.store.max_messages)
+        ):
+            messages = self.store.load_from_checkpoint(conversation_id)
+            ids = [_message_id(message) for message in messages]
+        if not messages:
+            return
+        window = take_window(messages, self.token_budget)
+        older = messages[: len(messages) - len(window)]
+
+        if last_id and last_id in ids:
+            new_messages = older[ids.index(last_id) + 1 :]
+        else:
+            new_messages = older
+        if not new_messages:
+            return
+
+        conversation = "\n".join(
+            f"{message.type}: {message.content}" for message in new_messages
+        )
+        prompt = [
+            SystemMessage(content=ChatBotPrompts.SUMMARY_SYSTEM),
+            HumanMessage(
+                content=ChatBotPrompts.summary_prompt(
+                    current.get("summary", ""), conversation
+                )
+            ),
+        ]
+        summary = scheduled_summary_llm.invoke(prompt).content
+        get_redis().set(
+            self._summary_key(conversation_id),
+            json.dumps({"summary": summary, "last_id": _message_id(new_messages[-1])}),
+            ex=self.store.ttl,
+        )
+
+    def schedule_summary(self, conversation_id: str) -> None:
+        """Update the summary on the background loop, at most once at a time
+        per conversation."""
+        if not MEMORY_SUMMARY_ENABLED:
+            return
+        with self._lock:
+            if conversation_id in self._updating:
+                return
+            self._updating.add(conversation_id)
+
+        def done(future):
+            with self._lock:
+                self._updating.discard(conversation_id)
+            if not future.cancelled() and future.exception() is not None:
+                print(f"Error updating conversation summary: {future.exception()}")
+
+        future = run_in_background(
+            asyncio.to_thread(self.update_summary, conversation_id)
+        )
+        future.add_done_callback(done)
+
+    def clear(self, conversation_id: str) -> None:
+        get_redis().delete(self._summary_key(conversation_id))
+
+
+conversation_memory = ConversationMemory(history_store)
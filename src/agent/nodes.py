@@ -1,21 +1,47 @@
-import asyncio
-from io import BytesIO
+import os
 from typing import List
 from dotenv import load_dotenv
-from langchain_unstructured.document_loaders import UnstructuredLoader
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_openai import ChatOpenAI
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from pydantic import BaseModel, Field
 from src.agent.prompts import MindMapPrompts
-from src.agent.state import TopicState, TranscriptState
+from src.agent.state import TopicState, TranscriptChunk, TranscriptState
+from src.agent.cache import llm_cache
+from src.agent.connection import embeddings
+from src.agent.loaders import load_transcript
+from src.agent.preclean import count_tokens, estimate_quality, pre_clean
+from src.agent.scheduler import scheduled
+from src.agent.utils import (
+    TopicMerger,
+    chunk_transcript,
+    gather_bounded,
+    timed_branch,
+)
 
 load_dotenv()
-llm = ChatOpenAI(model="gpt-5-nano", temperature=1)
+llm = ChatOpenAI(model="gpt-5-nano", temperature=1, cache=llm_cache)
+# Ingestion calls run at batch priority through the shared LLM scheduler.
+batch_llm = scheduled(llm, llm.model_name)
 
 CHUNK_SIZE = 1500
 CHUNK_OVERLAP = 200
 
+CLEAN_CHUNK_SIZE = int(os.getenv("CLEAN_CHUNK_SIZE", "6000"))
+CLEAN_CONCURRENCY = int(os.getenv("CLEAN_CONCURRENCY", "4"))
+MAX_RECLEAN_ROUNDS = int(os.getenv("MAX_RECLEAN_ROUNDS", "2"))
+QUALITY_THRESHOLD = 7
+SKIP_CLEAN_FOR_STRUCTURED = (
+    os.getenv("SKIP_CLEAN_FOR_STRUCTURED", "true").lower() == "true"
+)
+SKIP_CLEAN_FOR_HEURISTIC_PASS = (
+    os.getenv("SKIP_CLEAN_FOR_HEURISTIC_PASS", "true").lower() == "true"
+)
+
+TOPIC_WINDOW_SIZE = int(os.getenv("TOPIC_WINDOW_SIZE", "6000"))
+TOPIC_CONCURRENCY = int(os.getenv("TOPIC_CONCURRENCY", "4"))
+PARTICIPANTS_CONCURRENCY = int(os.getenv("PARTICIPANTS_CONCURRENCY", "4"))
+TOPIC_MERGE_EMBEDDINGS = os.getenv("TOPIC_MERGE_EMBEDDINGS", "false").lower() == "true"
+
 
 class QuestionsOutput(BaseModel):
     questions: List[str] = Field(default_factory=list)
@@ -34,60 +60,132 @@ class TopicsOutput(BaseModel):
 
 
 def load_transcript_node(state: TranscriptState):
-    file = state.file
-    file_name = state.file_name
-    bytes_io = BytesIO(file)
-
-    loader = UnstructuredLoader(file=bytes_io, metadata_filename=file_name)
+    loaded = load_transcript(state.file_path, state.file_name)
+    return {"transcript": loaded.text, "structured": loaded.structured}
+
+
+def pre_clean_node(state: TranscriptState):
+    """Apply the rule-based clean and record how many tokens it saved."""
+    transcript = pre_clean(state.transcript)
+    removed_tokens = count_tokens(state.transcript) - count_tokens(transcript)
+    return {
+        "transcript": transcript,
+        "pre_clean_removed_tokens": max(removed_tokens, 0),
+        "heuristic_quality": estimate_quality(transcript),
+    }
+
+
+def pre_clean_condition_node(state: TranscriptState):
+    """Skip the LLM clean for structured or already well-formed transcripts."""
+    if state.structured and SKIP_CLEAN_FOR_STRUCTURED:
+        return "skip"
+    if (
+        SKIP_CLEAN_FOR_HEURISTIC_PASS
+        and state.heuristic_quality is not None
+        and state.heuristic_quality >= QUALITY_THRESHOLD
+    ):
+        return "skip"
+    return "clean"
+
+
+def _split_for_cleaning(transcript: str) -> List[str]:
+    chunks = chunk_transcript(transcript, CLEAN_CHUNK_SIZE, chunk_overlap=0)
+    return [chunk.text for chunk in chunks]
+
+
+async def clean_transcript_node(state: TranscriptState):
+    """Clean the transcript chunk by chunk. On a reclean round only the
+    chunks that failed the quality check are sent back to the LLM."""
+    if state.clean_chunks:
+        chunks = list(state.clean_chunks)
+        scores = list(state.chunk_scores)
+    else:
+        chunks = _split_for_cleaning(state.transcript)
+        scores = [None] * len(chunks)
 
-    documents = loader.load()
+    to_clean = [
+        index
+        for index, score in enumerate(scores)
+        if score is None or score < QUALITY_THRESHOLD
+    ]
 
-    content = "\n".join([doc.page_content for doc in documents])
-    return {"transcript": content}
+    async def clean_chunk(index: int):
+        messages = [
+            SystemMessage(content=MindMapPrompts.CLEAN_TRANSCRIPT_SYSTEM),
+            HumanMessage(content=MindMapPrompts.clean_transcript_prompt(chunks[index])),
+        ]
+        response = await batch_llm.ainvoke(messages)
+        return response.content
+
+    cleaned = await gather_bounded(to_clean, clean_chunk, CLEAN_CONCURRENCY)
+    for index, text in zip(to_clean, cleaned):
+        chunks[index] = text
+        scores[index] = None
+
+    return {
+        "clean_chunks": chunks,
+        "chunk_scores": scores,
+        "clean_rounds": state.clean_rounds + 1,
+        "transcript": "\n".join(chunks),
+    }
+
+
+async def quality_check_node(state: TranscriptState):
+    """Score every chunk that has not been scored since it was last cleaned."""
+    chunks = state.clean_chunks
+    scores = list(state.chunk_scores)
+    structured_llm = scheduled(
+        llm.with_structured_output(QualityCheckOutput), llm.model_name
+    )
 
+    to_score = [index for index, score in enumerate(scores) if score is None]
 
-def clean_transcript_node(state: TranscriptState):
-    transcript = state.transcript
-    messages = [
-        SystemMessage(content=MindMapPrompts.CLEAN_TRANSCRIPT_SYSTEM),
-        HumanMessage(content=MindMapPrompts.clean_transcript_prompt(transcript)),
-    ]
-
-    cleaned_transcript = llm.invoke(messages)
-    return {"transcript": cleaned_transcript.content}
+    async def score_chunk(index: int):
+        messages = [
+            SystemMessage(content=MindMapPrompts.QUALITY_CHECK_SYSTEM),
+            HumanMessage(content=MindMapPrompts.quality_check_prompt(chunks[index])),
+        ]
+        result = await structured_llm.ainvoke(messages)
+        return result.quality_check
 
+    results = await gather_bounded(to_score, score_chunk, CLEAN_CONCURRENCY)
+    for index, score in zip(to_score, results):
+        scores[index] = score
 
-def quality_check_node(state: TranscriptState):
-    transcript = state.transcript
-    messages = [
-        SystemMessage(content=MindMapPrompts.QUALITY_CHECK_SYSTEM),
-        HumanMessage(content=MindMapPrompts.quality_check_prompt(transcript)),
-    ]
-    structured_llm = llm.with_structured_output(QualityCheckOutput)
-    result = structured_llm.invoke(messages)
-    return {"quality_check": result.quality_check}
+    return {
+        "chunk_scores": scores,
+        "quality_check": min(scores) if scores else None,
+    }
 
 
 def quality_score_condition_node(state: TranscriptState):
-    quality_check = state.quality_check
-    if quality_check < 7:
-        return "reclean"
-    else:
+    if all(score >= QUALITY_THRESHOLD for score in state.chunk_scores):
+        return "pass"
+
+    max_reclean_rounds = (
+        state.max_reclean_rounds
+        if state.max_reclean_rounds is not None
+        else MAX_RECLEAN_ROUNDS
+    )
+    # The first round is the initial clean, every further round is a reclean.
+    if state.clean_rounds > max_reclean_rounds:
         return "pass"
+    return "reclean"
 
 
 def split_transcript_node(state: TranscriptState):
     transcript = state.transcript
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-    )
-    return {"transcript_chunks": text_splitter.split_text(transcript)}
+    return {
+        "transcript_chunks": chunk_transcript(transcript, CHUNK_SIZE, CHUNK_OVERLAP)
+    }
 
 
+@timed_branch("identify_participants")
 async def identify_participants_node(state: TranscriptState):
     transcript_chunks = state.transcript_chunks
-    structured_llm = llm.with_structured_output(ParticipantsOutput)
+    structured_llm = scheduled(
+        llm.with_structured_output(ParticipantsOutput), llm.model_name
+    )
 
     async def process_chunk(chunk):
         messages = [
@@ -97,8 +195,11 @@ async def identify_participants_node(state: TranscriptState):
         response = await structured_llm.ainvoke(messages)
         return response.participants
 
-    tasks = [process_chunk(chunk) for chunk in transcript_chunks]
-    chunk_results = await asyncio.gather(*tasks)
+    chunk_results = await gather_bounded(
+        [chunk.text for chunk in transcript_chunks],
+        process_chunk,
+        PARTICIPANTS_CONCURRENCY,
+    )
 
     participants = set()
     for chunk_participants in chunk_results:
@@ -107,23 +208,70 @@ async def identify_participants_node(state: TranscriptState):
     return {"participants": list(participants)}
 
 
+def _topic_windows(transcript: str, chunks: List[TranscriptChunk]) -> List[str]:
+    """Group consecutive chunks into transcript spans of up to TOPIC_WINDOW_SIZE characters."""
+    windows = []
+    first = None
+    last = None
+    for chunk in chunks:
+        if first is not None and chunk.end - first.start > TOPIC_WINDOW_SIZE:
+            windows.append(transcript[first.start : last.end])
+            first = None
+        if first is None:
+            first = chunk
+        last = chunk
+    if first is not None:
+        windows.append(transcript[first.start : last.end])
+    return windows
+
+
+@timed_branch("identify_topics")
 async def identify_topics_node(state: TranscriptState):
-    transcript = state.transcript
-    structured_llm = llm.with_structured_output(TopicsOutput)
-
-    messages = [
-        SystemMessage(content=MindMapPrompts.IDENTIFY_TOPICS_SYSTEM),
-        HumanMessage(content=MindMapPrompts.identify_topics_prompt(transcript)),
+    """Map-reduce topic extraction.
+
+    Map: extract topics and content segments from each window of chunks in
+    parallel. Reduce: merge duplicate topics across windows and resolve
+    connected topics to the merged titles.
+    """
+    windows = _topic_windows(state.transcript, state.transcript_chunks) or [
+        state.transcript
     ]
-    response = await structured_llm.ainvoke(messages)
-    topics = response.topics
+    structured_llm = scheduled(
+        llm.with_structured_output(TopicsOutput), llm.model_name
+    )
+
+    async def extract_topics(window: str):
+        messages = [
+            SystemMessage(content=MindMapPrompts.IDENTIFY_TOPICS_SYSTEM),
+            HumanMessage(content=MindMapPrompts.identify_topics_prompt(window)),
+        ]
+        response = await structured_llm.ainvoke(messages)
+        return response.topics
+
+    window_topics = await gather_bounded(windows, extract_topics, TOPIC_CONCURRENCY)
+
+    title_vectors = None
+    if TOPIC_MERGE_EMBEDDINGS and len(window_topics) > 1:
+        titles = list(
+            {topic.title for topics in window_topics for topic in topics if topic.title}
+        )
+        vectors = await embeddings.aembed_documents(titles)
+        title_vectors = dict(zip(titles, vectors))
+
+    merger = TopicMerger(title_vectors=title_vectors)
+    for topics in window_topics:
+        for topic in topics:
+            merger.add(topic)
 
-    return {"topics": topics}
+    return {"topics": merger.result()}
 
 
+@timed_branch("create_questions")
 async def create_questions_node(state: TranscriptState):
     transcript = state.transcript
-    structured_llm = llm.with_structured_output(QuestionsOutput)
+    structured_llm = scheduled(
+        llm.with_structured_output(QuestionsOutput), llm.model_name
+    )
 
     messages = [
         SystemMessage(content=MindMapPrompts.CREATE_QUESTIONS_SYSTEM),
@@ -132,3 +280,50 @@ async def create_questions_node(state: TranscriptState):
     response = await structured_llm.ainvoke(messages)
 
     return {"questions": response.questions}
+
+
+def _unique(values: List[str]) -> List[str]:
+    """Strip values and drop empty and case-insensitive duplicates, keeping order."""
+    unique = {}
+    for value in values:
+        value = (value or "").strip()
+        if value and value.casefold() not in unique:
+            unique[value.casefold()] = value
+    return list(unique.values())
+
+
+def assemble_node(state: TranscriptState):
+    """Join the extraction branches and validate their combined output.
+
+    Runs once all three branches have finished. Participants and questions
+    are de-duplicated, untitled empty topics are dropped and topic
+    connections are limited to topics that exist.
+    """
+    topics = [topic for topic in state.topics if topic.title or topic.content]
+    titles = {topic.title for topic in topics if topic.title}
+    topics = [
+        topic.model_copy(
+            update={
+                "connected_topics": [
+                    title
+                    for title in _unique(topic.connected_topics)
+                    if title in titles and title != topic.title
+                ]
+            }
+        )
+        for topic in topics
+    ]
+
+    for field, value in (
+        ("participants", state.participants),
+        ("topics", topics),
+        ("questions", state.questions),
+    ):
+        if not value:
+            print(f"Warning: transcript {state.file_name} produced no {field}")
+
+    return {
+        "participants": _unique(state.participants),
+        "topics": topics,
+        "questions": _unique(state.questions),
+    }
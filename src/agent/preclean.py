@@ -0,0 +1,149 @@
+"""
+Rule-based transcript pre-cleaning.
+
+Removes the noise the LLM clean would otherwise spend tokens on: timestamps,
+filler words, repeated words, duplicate lines and platform boilerplate
+("X started transcription", "Recording started", ...). A cheap heuristic
+then estimates transcript quality on the same 0-10 scale as the LLM quality
+check, so well-formed transcripts can skip the LLM clean.
+"""
+
+import re
+from functools import lru_cache
+from typing import List, Optional
+import tiktoken
+from src.agent.loaders import CUE_TIMING_PATTERN, LEADING_TIMESTAMP_PATTERN
+from src.agent.utils import SPEAKER_PATTERN
+
+TOKEN_ENCODING = "o200k_base"
+# Rough characters per token, used when the tokenizer is unavailable.
+CHARS_PER_TOKEN = 4
+
+BOILERPLATE_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in (
+        r"^(?:transcript|webvtt)$",
+        r"^.{0,60}\b(?:started|stopped|paused|resumed) (?:transcription|recording)$",
+        r"^.{0,60}\b(?:joined|left) the (?:meeting|call)$",
+        r"^(?:recording|transcription) (?:started|stopped)\.?$",
+        r"^this (?:meeting|call) is being (?:recorded|transcribed)\.?$",
+        # Meeting date headers, e.g. "July 9, 2025, 3:32PM"
+        r"^[a-z]+ \d{1,2}, \d{4}(?:,? \d{1,2}:\d{2}\s?(?:am|pm)?)?$",
+    )
+]
+INLINE_TIMESTAMP_PATTERN = re.compile(r"[\[(](?:\d{1,2}:)?\d{1,2}:\d{2}(?:[.,]\d+)?[\])]\s*")
+FILLER_PATTERN = re.compile(r"\b(?:u+m+|u+h+|e+r+m+|h+m+|m+h*m+|a+h+)\b[,.!?]?\s*", re.IGNORECASE)
+# A word said three or more times in a row is a stutter. Doubled words are
+# often grammatical ("I had had enough", "that that"), so only doubled
+# function words that are never repeated on purpose are collapsed.
+REPEATED_WORD_PATTERN = re.compile(r"\b(\w+)(?:\s+\1\b){2,}", re.IGNORECASE)
+STUTTER_PATTERN = re.compile(
+    r"\b(i|a|an|the|and|but|we|to|of)(?:\s+\1\b)+", re.IGNORECASE
+)
+SENTENCE_PATTERN = re.compile(r"[^.!?]+[.!?]*")
+
+
+@lru_cache(maxsize=1)
+def _encoding() -> Optional[tiktoken.Encoding]:
+    """The tokenizer, or None when its data cannot be loaded (e.g. offline on
+    first use, since tiktoken downloads it)."""
+    try:
+        return tiktoken.get_encoding(TOKEN_ENCODING)
+    except Exception as e:
+        print(f"Warning: {TOKEN_ENCODING} unavailable, estimating token counts: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return len(text or "") // CHARS_PER_TOKEN
+    return len(encoding.encode(text or "", disallowed_special=()))
+
+
+def _is_boilerplate(line: str) -> bool:
+    return any(pattern.match(line) for pattern in BOILERPLATE_PATTERNS)
+
+
+def _clean_text(text: str) -> str:
+    text = INLINE_TIMESTAMP_PATTERN.sub("", text)
+    text = FILLER_PATTERN.sub("", text)
+    text = REPEATED_WORD_PATTERN.sub(r"\1", text)
+    text = STUTTER_PATTERN.sub(r"\1", text)
+    text = re.sub(r"\s+([,.!?])", r"\1", text)
+    text = re.sub(r"([,.!?])[,.]+", r"\1", text)
+    text = re.sub(r"\s+", " ", text).strip(" ,")
+    return text[:1].upper() + text[1:]
+
+
+def pre_clean(transcript: str) -> str:
+    """Strip timestamps, fillers, duplicate lines and boilerplate from a transcript."""
+    lines: List[str] = []
+    previous = None
+    for line in transcript.splitlines():
+        line = line.strip()
+        if not line or CUE_TIMING_PATTERN.match(line) or line.isdigit():
+            continue
+        line = LEADING_TIMESTAMP_PATTERN.sub("", line)
+        if _is_boilerplate(line):
+            continue
+
+        match = SPEAKER_PATTERN.match(line)
+        if match:
+            text = _clean_text(line[match.end() :])
+            line = f"{match.group(1).strip()}: {text}" if text else ""
+        else:
+            line = _clean_text(line)
+
+        if not line or line == previous:
+            continue
+        lines.append(line)
+        previous = line
+    return "\n".join(lines)
+
+
+def estimate_quality(transcript: str) -> int:
+    """Estimate transcript quality on a 0-10 scale without calling the LLM.
+
+    Scores sentence capitalization, sentence-final punctuation and leftover
+    noise (timestamps, fillers), scaled by the share of speaker-labelled
+    lines. The rules cannot judge spelling or wording, so unlabelled text is
+    never trusted to skip the LLM clean on punctuation alone.
+    """
+    lines = [line for line in transcript.splitlines() if line.strip()]
+    if not lines:
+        return 0
+
+    texts = []
+    labelled = 0
+    for line in lines:
+        match = SPEAKER_PATTERN.match(line)
+        if match:
+            labelled += 1
+            texts.append(line[match.end() :])
+        else:
+            texts.append(line)
+
+    sentences = [
+        sentence.strip()
+        for text in texts
+        for sentence in SENTENCE_PATTERN.findall(text)
+        if sentence.strip()
+    ]
+    if not sentences:
+        return 0
+
+    capitalized = sum(1 for s in sentences if not s[0].isalpha() or s[0].isupper())
+    punctuated = sum(1 for text in texts if text.rstrip()[-1:] in ".!?")
+    noisy = sum(
+        1
+        for text in texts
+        if INLINE_TIMESTAMP_PATTERN.search(text) or FILLER_PATTERN.search(text)
+    )
+
+    text_score = (
+        0.4 * capitalized / len(sentences)
+        + 0.35 * punctuated / len(texts)
+        + 0.25 * (1 - noisy / len(texts))
+    )
+    return round(10 * text_score * labelled / len(lines))
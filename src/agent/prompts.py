@@ -113,3 +113,22 @@ class ChatBotPrompts:
         - For transcript-related or mindmap-related questions, use any appropriate tool.
         - For general internet searches, use the query_internet tool.
     """
+
+    SUMMARY_SYSTEM = """
+    You maintain a running summary of a conversation between a user and an assistant.
+        - Keep facts, decisions, names, open questions and user preferences.
+        - Drop greetings, filler and anything already answered and no longer relevant.
+        - Write at most a few short paragraphs.
+    """
+
+    @staticmethod
+    def summary_prompt(summary: str, conversation: str):
+        return f"""
+        Here is the current summary: {summary or "(none yet)"}
+        Here are the messages to add to it: {conversation}
+        Return the updated summary.
+        """
+
+    @staticmethod
+    def summary_context(summary: str):
+        return f"Summary of the earlier conversation:\n{summary}"
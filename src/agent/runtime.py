@@ -0,0 +1,73 @@
+"""
+Long-lived background event loop for async work that outlives a single
+Flask request, such as streamed chat runs.
+
+Flask runs each async view in a fresh event loop, so loop-bound resources
+(async connection pools, HTTP sessions) cannot be shared across requests
+there. Work scheduled here always runs on the same loop.
+"""
+
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future
+from typing import AsyncIterator, Coroutine, Iterator, TypeVar
+
+T = TypeVar("T")
+
+_loop: asyncio.AbstractEventLoop | None = None
+_lock = threading.Lock()
+
+_STREAM_END = object()
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """Get the background event loop, starting its thread on first use."""
+    global _loop
+    if _loop is None:
+        with _lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name="agent-event-loop", daemon=True
+                )
+                thread.start()
+                _loop = loop
+    return _loop
+
+
+def run_in_background(coro: Coroutine[None, None, T]) -> Future:
+    """Schedule a coroutine on the background loop and return its future."""
+    return asyncio.run_coroutine_threadsafe(coro, get_background_loop())
+
+
+def iterate_in_background(async_iterator: AsyncIterator[T]) -> Iterator[T]:
+    """Consume an async iterator on the background loop from synchronous code.
+
+    Items are handed over through a thread-safe queue as soon as they are
+    produced. Closing the returned iterator cancels the producer.
+    """
+    items: queue.Queue = queue.Queue()
+
+    async def produce():
+        try:
+            async for item in async_iterator:
+                items.put(item)
+        except BaseException as e:
+            items.put(e)
+            raise
+        finally:
+            items.put(_STREAM_END)
+
+    future = run_in_background(produce())
+    try:
+        while True:
+            item = items.get()
+            if item is _STREAM_END:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        if not future.done():
+            future.cancel()
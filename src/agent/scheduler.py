@@ -0,0 +1,341 @@
+"""
+Shared scheduler for LLM calls.
+
+Every model gets one ModelScheduler per process with:
+- a priority semaphore capping concurrent requests, where INTERACTIVE
+  callers (chat) are woken ahead of BATCH callers (transcript ingestion),
+- a tokens-per-minute budget, part of which is reserved for INTERACTIVE
+  callers so ingestion bursts cannot starve chat,
+- retries with exponential backoff on 429 responses, honouring Retry-After
+  and pausing the whole budget while the provider is throttling us.
+
+Flask runs async views in per-request event loops, ingestion runs on the
+background loop and some callers are synchronous, so nothing here is bound
+to an event loop: state is guarded by a threading lock and async waiters are
+woken with call_soon_threadsafe on their own loop.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+from dotenv import load_dotenv
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from openai import RateLimitError
+from src.agent.preclean import CHARS_PER_TOKEN
+
+load_dotenv()
+
+T = TypeVar("T")
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "200000"))
+LLM_INTERACTIVE_RESERVE = float(os.getenv("LLM_INTERACTIVE_RESERVE", "0.2"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "60"))
+LLM_OUTPUT_TOKEN_ESTIMATE = int(os.getenv("LLM_OUTPUT_TOKEN_ESTIMATE", "500"))
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BATCH = 1
+
+
+def _model_setting(name: str, model: str, default):
+    """Read a per-model override such as LLM_TOKENS_PER_MINUTE_GPT_4O_MINI."""
+    suffix = "".join(c if c.isalnum() else "_" for c in model).upper()
+    value = os.getenv(f"{name}_{suffix}")
+    return type(default)(value) if value is not None else default
+
+
+class _Waiter:
+    __slots__ = ("priority", "sequence", "loop", "future", "event", "granted", "cancelled")
+
+    def __init__(self, priority: int, sequence: int):
+        self.priority = priority
+        self.sequence = sequence
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.future: Optional[asyncio.Future] = None
+        self.event: Optional[threading.Event] = None
+        self.granted = False
+        self.cancelled = False
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class PrioritySemaphore:
+    """Counting semaphore that hands free slots to the highest-priority waiter.
+
+    Usable from any event loop and from plain threads. Waiters of equal
+    priority are served in arrival order.
+    """
+
+    def __init__(self, value: int):
+        self._value = max(value, 1)
+        self._waiters: List[_Waiter] = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def _try_acquire(self, priority: int) -> Optional[_Waiter]:
+        """Take a slot, or enqueue and return a waiter. Caller holds the lock."""
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+            return None
+        waiter = _Waiter(priority, next(self._sequence))
+        heapq.heappush(self._waiters, waiter)
+        return waiter
+
+    async def acquire(self, priority: int = Priority.BATCH) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            waiter = self._try_acquire(priority)
+            if waiter is None:
+                return
+            waiter.loop = loop
+            waiter.future = loop.create_future()
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                waiter.cancelled = True
+                granted = waiter.granted
+            if granted:
+                self.release()
+            raise
+
+    def acquire_sync(self, priority: int = Priority.BATCH) -> None:
+        with self._lock:
+            waiter = self._try_acquire(priority)
+            if waiter is None:
+                return
+            waiter.event = threading.Event()
+        waiter.event.wait()
+
+    def release(self) -> None:
+        with self._lock:
+            waiter = None
+            while self._waiters:
+                candidate = heapq.heappop(self._waiters)
+                if not candidate.cancelled:
+                    waiter = candidate
+                    waiter.granted = True
+                    break
+            if waiter is None:
+                self._value += 1
+                return
+
+        if waiter.event is not None:
+            waiter.event.set()
+            return
+        try:
+            waiter.loop.call_soon_threadsafe(_wake, waiter.future)
+        except RuntimeError:
+            # The waiter's loop has closed, pass the slot on.
+            self.release()
+
+
+class TokenBudget:
+    """Tokens-per-minute bucket shared by every caller of a model.
+
+    BATCH callers may not dip into the reserved share of the bucket, which
+    stays available to INTERACTIVE callers.
+    """
+
+    def __init__(self, tokens_per_minute: int, interactive_reserve: float):
+        self.capacity = float(tokens_per_minute)
+        self.rate = self.capacity / 60
+        self.reserve = self.capacity * min(max(interactive_reserve, 0.0), 0.9)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def try_take(self, tokens: int, priority: int) -> float:
+        """Take tokens and return 0, or return how many seconds to wait first."""
+        floor = self.reserve if priority == Priority.BATCH else 0.0
+        # Oversized requests would never fit, let them through on a full bucket.
+        tokens = min(tokens, self.capacity - floor)
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens - tokens >= floor:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens + floor - self._tokens) / self.rate
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """Correct an estimate once the real usage is known."""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + estimated - actual)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def _retry_delay(error: RateLimitError, attempt: int) -> float:
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        if retry_after is not None:
+            return min(float(retry_after), LLM_BACKOFF_MAX)
+    except ValueError:
+        pass
+    delay = min(LLM_BACKOFF_BASE * 2**attempt, LLM_BACKOFF_MAX)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def _usage_tokens(result: Any) -> Optional[int]:
+    usage = getattr(result, "usage_metadata", None)
+    if usage:
+        return usage.get("total_tokens")
+    return None
+
+
+class ModelScheduler:
+    def __init__(self, model: str, max_concurrency: int, tokens_per_minute: int):
+        self.model = model
+        self.semaphore = PrioritySemaphore(max_concurrency)
+        self.budget = (
+            TokenBudget(tokens_per_minute, LLM_INTERACTIVE_RESERVE)
+            if tokens_per_minute > 0
+            else None
+        )
+
+    def _settle(self, tokens: int, result: Any) -> None:
+        actual = _usage_tokens(result)
+        if self.budget is not None and actual is not None:
+            self.budget.settle(tokens, actual)
+
+    def _throttled(self, error: RateLimitError, attempt: int, tokens: int) -> float:
+        """Refund the rejected call's tokens and pause the budget."""
+        delay = _retry_delay(error, attempt)
+        print(f"Warning: {self.model} rate limited, retrying in {delay:.1f}s")
+        if self.budget is not None:
+            self.budget.settle(tokens, 0)
+            self.budget.pause(delay)
+        return delay
+
+    async def run(
+        self, call: Callable[[], Awaitable[T]], tokens: int, priority: int
+    ) -> T:
+        """Run an async LLM call once budget and a concurrency slot are free."""
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            while self.budget is not None:
+                wait = self.budget.try_take(tokens, priority)
+                if not wait:
+                    break
+                await asyncio.sleep(wait)
+
+            await self.semaphore.acquire(priority)
+            try:
+                result = await call()
+            except RateLimitError as e:
+                if attempt == LLM_MAX_RETRIES:
+                    raise
+                delay = self._throttled(e, attempt, tokens)
+            else:
+                self._settle(tokens, result)
+                return result
+            finally:
+                self.semaphore.release()
+            await asyncio.sleep(delay)
+
+    def run_sync(self, call: Callable[[], T], tokens: int, priority: int) -> T:
+        """Blocking counterpart of run for synchronous callers."""
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            while self.budget is not None:
+                wait = self.budget.try_take(tokens, priority)
+                if not wait:
+                    break
+                time.sleep(wait)
+
+            self.semaphore.acquire_sync(priority)
+            try:
+                result = call()
+            except RateLimitError as e:
+                if attempt == LLM_MAX_RETRIES:
+                    raise
+                delay = self._throttled(e, attempt, tokens)
+            else:
+                self._settle(tokens, result)
+                return result
+            finally:
+                self.semaphore.release()
+            time.sleep(delay)
+
+
+_schedulers: Dict[str, ModelScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(model: str) -> ModelScheduler:
+    with _schedulers_lock:
+        scheduler = _schedulers.get(model)
+        if scheduler is None:
+            scheduler = ModelScheduler(
+                model,
+                _model_setting("LLM_MAX_CONCURRENCY", model, LLM_MAX_CONCURRENCY),
+                _model_setting("LLM_TOKENS_PER_MINUTE", model, LLM_TOKENS_PER_MINUTE),
+            )
+            _schedulers[model] = scheduler
+        return scheduler
+
+
+def estimate_tokens(input: Any) -> int:
+    """Rough prompt size plus expected completion size, for budgeting only."""
+    if hasattr(input, "to_messages"):
+        input = input.to_messages()
+    if isinstance(input, dict):
+        parts = input.values()
+    elif isinstance(input, (list, tuple)):
+        parts = input
+    else:
+        parts = [input]
+    chars = sum(len(str(getattr(part, "content", part))) for part in parts)
+    return chars // CHARS_PER_TOKEN + LLM_OUTPUT_TOKEN_ESTIMATE
+
+
+def scheduled(
+    runnable: Runnable, model: str, priority: int = Priority.BATCH
+) -> Runnable:
+    """Wrap a model runnable so every call goes through the model's scheduler.
+
+    Callbacks and config are passed through, so streaming and astream_events
+    still see the wrapped model's tokens.
+    """
+    scheduler = get_scheduler(model)
+
+    def invoke(input, config: RunnableConfig):
+        return scheduler.run_sync(
+            lambda: runnable.invoke(input, config=config),
+            estimate_tokens(input),
+            priority,
+        )
+
+    async def ainvoke(input, config: RunnableConfig):
+        return await scheduler.run(
+            lambda: runnable.ainvoke(input, config=config),
+            estimate_tokens(input),
+            priority,
+        )
+
+    return RunnableLambda(invoke, afunc=ainvoke, name=f"scheduled:{model}")
@@ -1,4 +1,5 @@
-from typing import List, Optional
+import operator
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 from typing import Annotated
 from langgraph.graph import add_messages
@@ -16,15 +17,33 @@ class TopicState(BaseModel):
     connected_topics: List[str] = Field(default_factory=list)
 
 
+class TranscriptChunk(BaseModel):
+    text: str
+    start: int
+    end: int
+    speakers: List[str] = Field(default_factory=list)
+
+
 class TranscriptState(BaseModel):
-    file: bytes
+    file_path: str
     file_name: str
+    structured: bool = False
+    pre_clean_removed_tokens: int = 0
+    heuristic_quality: Optional[int] = None
     quality_check: Optional[int] = None
-    transcript_chunks: List[str] = Field(default_factory=list)
+    clean_chunks: List[str] = Field(default_factory=list)
+    chunk_scores: List[Optional[int]] = Field(default_factory=list)
+    clean_rounds: int = 0
+    max_reclean_rounds: Optional[int] = None
+    transcript_chunks: List[TranscriptChunk] = Field(default_factory=list)
     transcript: Optional[str] = None
     participants: List[str] = Field(default_factory=list)
     topics: List[TopicState] = Field(default_factory=list)
     questions: List[str] = Field(default_factory=list)
+    # Seconds spent in each extraction branch, merged as the branches finish.
+    branch_timings: Annotated[Dict[str, float], operator.or_] = Field(
+        default_factory=dict
+    )
 
 
 class ChatBotState(BaseModel):
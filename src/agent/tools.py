@@ -3,10 +3,15 @@ from langchain_core.tools import tool
 from langchain_tavily import TavilySearch
 from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
+from src.agent.cache import llm_cache
+from src.agent.scheduler import Priority, scheduled
 
 
 load_dotenv()
-title_llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=1, max_completion_tokens=50)
+title_llm = ChatOpenAI(
+    model="gpt-3.5-turbo", temperature=1, max_completion_tokens=50, cache=llm_cache
+)
+scheduled_title_llm = scheduled(title_llm, title_llm.model_name, Priority.INTERACTIVE)
 
 
 def create_title(query: str) -> str:
@@ -16,7 +21,7 @@ def create_title(query: str) -> str:
         ),
         HumanMessage(content=query),
     ]
-    return title_llm.invoke(messages).content
+    return scheduled_title_llm.invoke(messages).content
 
 
 @tool(parse_docstring=True)
@@ -0,0 +1,223 @@
+import asyncio
+import functools
+import math
+import re
+import time
+from difflib import SequenceMatcher
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, TypeVar
+from src.agent.state import TopicState, TranscriptChunk
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+async def gather_bounded(
+    items: Iterable[T], func: Callable[[T], Awaitable[R]], limit: int
+) -> List[R]:
+    """Run func over items concurrently with at most `limit` calls in flight.
+
+    Results are returned in the same order as items.
+    """
+    semaphore = asyncio.Semaphore(max(limit, 1))
+
+    async def run(item: T) -> R:
+        async with semaphore:
+            return await func(item)
+
+    return await asyncio.gather(*(run(item) for item in items))
+
+
+def timed_branch(name: str):
+    """Record an async node's wall time under `name` in state.branch_timings."""
+
+    def decorator(node):
+        @functools.wraps(node)
+        async def wrapper(state):
+            start = time.perf_counter()
+            update = await node(state)
+            elapsed = time.perf_counter() - start
+            return {**update, "branch_timings": {name: round(elapsed, 3)}}
+
+        return wrapper
+
+    return decorator
+
+
+SPEAKER_PATTERN = re.compile(r"^\s*([A-Z][\w.'\- ]{0,40}?)\s*:\s")
+
+
+def _split_span(text: str, start: int, end: int, size: int, overlap: int):
+    """Split text[start:end] into spans of at most `size` characters on word boundaries."""
+    spans = []
+    position = start
+    while position < end:
+        stop = min(position + size, end)
+        if stop < end:
+            space = text.rfind(" ", position, stop)
+            if space > position:
+                stop = space
+        spans.append((position, stop))
+        if stop >= end:
+            break
+        next_position = max(stop - overlap, position + 1)
+        space = text.find(" ", next_position, stop)
+        position = space + 1 if space != -1 else next_position
+    return spans
+
+
+def chunk_transcript(
+    transcript: str, chunk_size: int, chunk_overlap: int
+) -> List[TranscriptChunk]:
+    """Split a transcript into chunks on speaker turn (line) boundaries.
+
+    Each chunk keeps its character offsets into the transcript and the
+    speakers whose turns it contains. Consecutive chunks overlap by whole
+    turns totalling at most chunk_overlap characters; a turn longer than
+    chunk_size is split on word boundaries.
+    """
+    turns = []
+    position = 0
+    speaker = None
+    for line in transcript.splitlines(keepends=True):
+        line_start = position
+        position += len(line)
+        stripped = line.strip()
+        if not stripped:
+            continue
+        match = SPEAKER_PATTERN.match(line)
+        if match:
+            speaker = match.group(1).strip()
+        start = line_start + len(line) - len(line.lstrip())
+        end = line_start + len(line.rstrip())
+        for span_start, span_end in _split_span(
+            transcript, start, end, chunk_size, chunk_overlap
+        ):
+            turns.append((span_start, span_end, speaker))
+
+    chunks = []
+    index = 0
+    while index < len(turns):
+        start = turns[index][0]
+        stop = index + 1
+        while stop < len(turns) and turns[stop][1] - start <= chunk_size:
+            stop += 1
+        end = turns[stop - 1][1]
+
+        speakers = []
+        for _, _, turn_speaker in turns[index:stop]:
+            if turn_speaker and turn_speaker not in speakers:
+                speakers.append(turn_speaker)
+        chunks.append(
+            TranscriptChunk(
+                text=transcript[start:end], start=start, end=end, speakers=speakers
+            )
+        )
+        if stop >= len(turns):
+            break
+
+        next_index = stop
+        while next_index - 1 > index and end - turns[next_index - 1][0] <= chunk_overlap:
+            next_index -= 1
+        index = next_index
+    return chunks
+
+
+def normalize_title(title: str) -> str:
+    """Lowercase a topic title and strip punctuation and extra whitespace."""
+    cleaned = re.sub(r"[^\w\s]", " ", title.lower())
+    return " ".join(cleaned.split())
+
+
+def _cosine_similarity(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class TopicMerger:
+    """Reduce step for map-reduce topic extraction.
+
+    Topics extracted from different chunks are merged when their normalized
+    titles match, are close by edit ratio, or (when title vectors are given)
+    their title embeddings are close. Content segments are deduplicated and
+    connected topic titles are resolved to the merged titles.
+    """
+
+    def __init__(
+        self,
+        title_similarity: float = 0.85,
+        embedding_similarity: float = 0.9,
+        title_vectors: Optional[Dict[str, List[float]]] = None,
+    ):
+        self.title_similarity = title_similarity
+        self.embedding_similarity = embedding_similarity
+        self.title_vectors = title_vectors or {}
+        self._topics: List[TopicState] = []
+        self._keys: List[str] = []
+        self._aliases: Dict[str, int] = {}
+        self._seen_content: List[set] = []
+
+    def _find(self, title: str) -> Optional[int]:
+        key = normalize_title(title)
+        if key in self._aliases:
+            return self._aliases[key]
+
+        for index, existing in enumerate(self._keys):
+            if SequenceMatcher(None, key, existing).ratio() >= self.title_similarity:
+                return index
+
+        vector = self.title_vectors.get(title)
+        if vector is not None:
+            for index, topic in enumerate(self._topics):
+                existing_vector = self.title_vectors.get(topic.title)
+                if (
+                    existing_vector is not None
+                    and _cosine_similarity(vector, existing_vector)
+                    >= self.embedding_similarity
+                ):
+                    return index
+        return None
+
+    def add(self, topic: TopicState) -> None:
+        if not topic.title:
+            return
+        key = normalize_title(topic.title)
+        index = self._find(topic.title)
+        if index is None:
+            index = len(self._topics)
+            self._topics.append(TopicState(title=topic.title))
+            self._keys.append(key)
+            self._seen_content.append(set())
+        self._aliases[key] = index
+
+        merged = self._topics[index]
+        for content in topic.content:
+            content_key = (content.speaker, " ".join((content.text or "").split()))
+            if content_key in self._seen_content[index]:
+                continue
+            self._seen_content[index].add(content_key)
+            merged.content.append(content)
+        for connected in topic.connected_topics:
+            if connected not in merged.connected_topics:
+                merged.connected_topics.append(connected)
+
+    def result(self) -> List[TopicState]:
+        """Return merged topics with connections pointing at merged titles."""
+        topics = []
+        for index, topic in enumerate(self._topics):
+            connected_topics = []
+            for connected in topic.connected_topics:
+                target = self._find(connected)
+                if target is None or target == index:
+                    continue
+                title = self._topics[target].title
+                if title not in connected_topics:
+                    connected_topics.append(title)
+            topics.append(
+                TopicState(
+                    title=topic.title,
+                    content=topic.content,
+                    connected_topics=connected_topics,
+                )
+            )
+        return topics
@@ -0,0 +1,385 @@
+"""
+Background job pipeline for transcript ingestion.
+
+POST /dashboard/mindmap enqueues a MindMapJob and returns immediately.
+Workers pull jobs, run transcript_graph on the shared background event loop,
+record progress per graph node and persist the result.
+
+Uploads are spooled to the uploads folder and jobs carry only the file path,
+so workers must share that folder with the app. Jobs are queued in Redis by
+default so separate worker processes (python -m src.flask.jobs) can absorb
+upload bursts; those refuse to start unless UPLOAD_DIR names the shared
+upload storage. Setting
+JOB_QUEUE_BACKEND=local keeps the queue in-process, which is useful for
+tests and local development without Redis.
+
+Jobs never carry the user's access token: workers persist results with the
+service role on behalf of the job's user_id. A Redis worker moves each job
+onto a processing list while it runs, holds a lease key that it renews
+while the job runs, and removes the job once it completes or fails. Every
+worker process also runs a reaper that moves jobs whose lease has expired
+(their worker died) from PROCESSING_KEY back onto QUEUE_KEY.
+"""
+
+import os
+import queue
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+from src.agent.cache import pipeline_cache
+from src.agent.connection import get_redis
+from src.agent.graph import transcript_graph
+from src.agent.runtime import run_in_background
+from src.agent.state import TranscriptState
+from src.flask.models.job_models import JobStatus, MindMapJob
+from src.flask.supabase.utils import insert_transcript_data_async
+from src.flask.uploads import UPLOAD_DIR, remove_upload
+
+JOB_QUEUE_BACKEND = os.getenv(
+    "JOB_QUEUE_BACKEND", "redis" if os.getenv("REDIS_HOST") else "local"
+)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "86400"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_REAP_INTERVAL = int(os.getenv("JOB_REAP_INTERVAL", "60"))
+JOB_POLL_TIMEOUT = 5
+
+QUEUE_KEY = "mindmap:jobs"
+PROCESSING_KEY = "mindmap:jobs:processing"
+STATUS_KEY_PREFIX = "mindmap:job:"
+LEASE_KEY_PREFIX = "mindmap:job-lease:"
+
+# Move one exact payload between lists, only if it is still on the source list.
+REQUEUE_SCRIPT = """
+if redis.call('LREM', KEYS[1], 1, ARGV[1]) == 1 then
+  redis.call('LPUSH', KEYS[2], ARGV[1])
+  return 1
+end
+return 0
+"""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobQueue(ABC):
+    """Queue of MindMapJob payloads plus a status record per job."""
+
+    @abstractmethod
+    def push(self, job: MindMapJob) -> None: ...
+
+    @abstractmethod
+    def pop(self, timeout: float) -> Optional[Tuple[MindMapJob, str]]:
+        """Take the next job, returned with its payload exactly as queued."""
+
+    @abstractmethod
+    def ack(self, payload: str) -> None:
+        """Mark a popped job as finished, whether it succeeded or failed."""
+
+    def touch(self, job: MindMapJob) -> None:
+        """Renew a running job's lease. Queues without leases ignore this."""
+
+    def requeue_stale(self) -> int:
+        """Requeue jobs whose worker died. Returns how many were requeued."""
+        return 0
+
+    @abstractmethod
+    def get_status(self, job_id: str) -> Optional[JobStatus]: ...
+
+    @abstractmethod
+    def set_status(self, status: JobStatus) -> None: ...
+
+    def enqueue(self, job: MindMapJob) -> JobStatus:
+        now = _now()
+        status = JobStatus(
+            id=job.id,
+            user_id=job.user_id,
+            status="queued",
+            created_at=now,
+            updated_at=now,
+        )
+        self.set_status(status)
+        self.push(job)
+        return status
+
+    def update_status(self, job_id: str, **fields) -> None:
+        status = self.get_status(job_id)
+        if status is None:
+            return
+        self.set_status(status.model_copy(update={**fields, "updated_at": _now()}))
+
+
+class RedisJobQueue(JobQueue):
+    def __init__(self):
+        # Lease-less payloads seen by the previous sweep. A job is only
+        # requeued once it has no lease on two sweeps in a row, which covers
+        # the moment between BLMOVE and the worker setting the lease.
+        self._suspects: set = set()
+
+    def _lease_key(self, job_id: str) -> str:
+        return f"{LEASE_KEY_PREFIX}{job_id}"
+
+    def push(self, job: MindMapJob) -> None:
+        get_redis().rpush(QUEUE_KEY, job.model_dump_json())
+
+    def pop(self, timeout: float) -> Optional[Tuple[MindMapJob, str]]:
+        payload = get_redis().blmove(
+            QUEUE_KEY, PROCESSING_KEY, int(timeout), src="LEFT", dest="RIGHT"
+        )
+        if payload is None:
+            return None
+        job = MindMapJob.model_validate_json(payload)
+        self.touch(job)
+        return job, payload
+
+    def ack(self, payload: str) -> None:
+        # LREM needs the exact bytes on the list, not a re-serialized job.
+        # The lease is left to expire.
+        get_redis().lrem(PROCESSING_KEY, 1, payload)
+
+    def touch(self, job: MindMapJob) -> None:
+        get_redis().set(self._lease_key(job.id), "1", ex=JOB_LEASE_SECONDS)
+
+    def requeue_stale(self) -> int:
+        redis = get_redis()
+        suspects = set()
+        requeued = 0
+        for payload in redis.lrange(PROCESSING_KEY, 0, -1):
+            job = MindMapJob.model_validate_json(payload)
+            if redis.exists(self._lease_key(job.id)):
+                continue
+            if payload not in self._suspects:
+                suspects.add(payload)
+                continue
+            if redis.eval(REQUEUE_SCRIPT, 2, PROCESSING_KEY, QUEUE_KEY, payload):
+                requeued += 1
+                self.update_status(job.id, status="queued", current_node=None)
+        self._suspects = suspects
+        return requeued
+
+    def get_status(self, job_id: str) -> Optional[JobStatus]:
+        payload = get_redis().get(f"{STATUS_KEY_PREFIX}{job_id}")
+        if payload is None:
+            return None
+        return JobStatus.model_validate_json(payload)
+
+    def set_status(self, status: JobStatus) -> None:
+        get_redis().set(
+            f"{STATUS_KEY_PREFIX}{status.id}",
+            status.model_dump_json(),
+            ex=JOB_TTL_SECONDS,
+        )
+
+
+class LocalJobQueue(JobQueue):
+    def __init__(self):
+        self._jobs: queue.Queue = queue.Queue()
+        self._statuses: dict[str, JobStatus] = {}
+        self._lock = threading.Lock()
+
+    def push(self, job: MindMapJob) -> None:
+        self._jobs.put(job.model_dump_json())
+
+    def pop(self, timeout: float) -> Optional[Tuple[MindMapJob, str]]:
+        try:
+            payload = self._jobs.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        return MindMapJob.model_validate_json(payload), payload
+
+    def ack(self, payload: str) -> None:
+        self._jobs.task_done()
+
+    def get_status(self, job_id: str) -> Optional[JobStatus]:
+        with self._lock:
+            return self._statuses.get(job_id)
+
+    def set_status(self, status: JobStatus) -> None:
+        with self._lock:
+            self._statuses[status.id] = status
+
+
+_job_queue: JobQueue | None = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                if JOB_QUEUE_BACKEND == "local":
+                    _job_queue = LocalJobQueue()
+                else:
+                    _job_queue = RedisJobQueue()
+    return _job_queue
+
+
+def create_mindmap_job(
+    file_path: str,
+    file_hash: str,
+    file_name: str,
+    title: str,
+    description: str,
+    date: str,
+    tags: list[str],
+    user_id: str,
+) -> JobStatus:
+    """Enqueue a spooled transcript upload and return its initial status."""
+    job = MindMapJob(
+        id=str(uuid.uuid4()),
+        file_path=file_path,
+        file_hash=file_hash,
+        file_name=file_name,
+        title=title,
+        description=description,
+        date=date,
+        tags=tags,
+        user_id=user_id,
+    )
+    return get_job_queue().enqueue(job)
+
+
+def get_job_status(job_id: str) -> Optional[JobStatus]:
+    return get_job_queue().get_status(job_id)
+
+
+async def run_transcript_graph(
+    job_queue: JobQueue, job: MindMapJob, transcript_state: TranscriptState
+) -> TranscriptState:
+    """Run the transcript graph, recording every node as it finishes."""
+    completed_nodes = []
+    result_dict = None
+    async for mode, chunk in transcript_graph.astream(
+        transcript_state, stream_mode=["updates", "values"]
+    ):
+        if mode == "values":
+            result_dict = chunk
+            continue
+        for node in chunk:
+            completed_nodes.append(node)
+        job_queue.update_status(
+            job.id,
+            current_node=completed_nodes[-1],
+            completed_nodes=list(completed_nodes),
+        )
+
+    return TranscriptState(**result_dict)
+
+
+async def process_job(job_queue: JobQueue, job: MindMapJob):
+    """Process a job, reusing the cached graph result for an identical upload."""
+    job_queue.update_status(job.id, status="running")
+
+    result = pipeline_cache.get(job.file_hash, job.file_name)
+    if result is not None:
+        job_queue.update_status(job.id, cached=True)
+    else:
+        if not os.path.exists(job.file_path):
+            raise FileNotFoundError(
+                f"Upload {job.file_path} is not visible to this worker, "
+                "UPLOAD_DIR must be storage shared with the app"
+            )
+        result = await run_transcript_graph(
+            job_queue,
+            job,
+            TranscriptState(file_path=job.file_path, file_name=job.file_name),
+        )
+        pipeline_cache.set(job.file_hash, job.file_name, result)
+        job_queue.update_status(job.id, branch_timings=result.branch_timings)
+
+    job_queue.update_status(job.id, current_node="persist")
+    mindmap = await insert_transcript_data_async(
+        job.user_id, result, job.title, job.description, job.date, job.tags
+    )
+    return mindmap.model_dump(mode="json")
+
+
+def run_worker(job_queue: JobQueue, stop_event: threading.Event):
+    """Pull jobs until stop_event is set. Each job runs on the background loop."""
+    while not stop_event.is_set():
+        try:
+            popped = job_queue.pop(JOB_POLL_TIMEOUT)
+        except Exception as e:
+            print(f"Error polling job queue: {e}")
+            stop_event.wait(JOB_POLL_TIMEOUT)
+            continue
+        if popped is None:
+            continue
+        job, payload = popped
+
+        try:
+            future = run_in_background(process_job(job_queue, job))
+            while True:
+                try:
+                    result = future.result(timeout=JOB_LEASE_SECONDS / 3)
+                    break
+                except FutureTimeoutError:
+                    job_queue.touch(job)
+            job_queue.update_status(
+                job.id, status="completed", current_node=None, result=result
+            )
+        except Exception as e:
+            print(f"Error processing job {job.id}: {e}")
+            job_queue.update_status(job.id, status="failed", error=str(e))
+        finally:
+            remove_upload(job.file_path)
+            try:
+                job_queue.ack(payload)
+            except Exception as e:
+                print(f"Error acknowledging job {job.id}: {e}")
+
+
+def run_reaper(job_queue: JobQueue, stop_event: threading.Event):
+    """Requeue jobs left behind by dead workers until stop_event is set."""
+    while not stop_event.wait(JOB_REAP_INTERVAL):
+        try:
+            requeued = job_queue.requeue_stale()
+            if requeued:
+                print(f"Warning: requeued {requeued} jobs from dead workers")
+        except Exception as e:
+            print(f"Error requeueing stale jobs: {e}")
+
+
+def start_workers(count: int = JOB_WORKERS) -> threading.Event:
+    """Start worker threads and a reaper thread in this process. Set the
+    returned event to stop them."""
+    stop_event = threading.Event()
+    job_queue = get_job_queue()
+    threading.Thread(
+        target=run_reaper,
+        args=(job_queue, stop_event),
+        name="mindmap-reaper",
+        daemon=True,
+    ).start()
+    for index in range(count):
+        threading.Thread(
+            target=run_worker,
+            args=(job_queue, stop_event),
+            name=f"mindmap-worker-{index}",
+            daemon=True,
+        ).start()
+    return stop_event
+
+
+def main():
+    # Standalone workers may run on another host than the app.
+    if not UPLOAD_DIR:
+        raise SystemExit(
+            "UPLOAD_DIR must be set to upload storage shared with the app "
+            "before starting standalone workers"
+        )
+    stop_event = start_workers()
+    try:
+        while not stop_event.is_set():
+            stop_event.wait(1)
+    except KeyboardInterrupt:
+        stop_event.set()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,27 @@
-import os
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from gotrue import Session
 from langchain_openai import ChatOpenAI
-from langchain_redis import RedisChatMessageHistory
-from src.agent.graph import transcript_graph
-from src.agent.state import TranscriptState, ChatBotState
-from src.agent.chatbot import create_rag_agent
+from src.agent.state import ChatBotState
+from src.agent.chatbot import (
+    astream_chat_events,
+    create_rag_agent,
+    rag_agent_config,
+)
 from src.agent.connection import (
-    get_checkpoint,
-    get_redis_client,
-    get_vectorstore_context,
+    get_async_checkpoint_pool,
+    get_checkpointer,
+    get_vectorstore,
+    warm_connections,
 )
 from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from src.agent.cache import llm_cache
+from src.agent.history import visible_messages
+from src.agent.runtime import iterate_in_background
 from src.flask.supabase.auth import (
     UserModel,
     refresh_session,
+    require_auth,
     signin,
     signout,
     signup,
@@ -23,7 +30,7 @@ from flask_cors import CORS
 from gotrue.errors import AuthApiError
 from gotrue.types import AuthResponse
 
-from src.flask.supabase.client import get_auth_token, get_client
+from src.flask.supabase.client import get_supabase_config
 from src.flask.supabase.mindmap import (
     get_mindmap_detail,
     get_user_mindmaps,
@@ -37,6 +44,7 @@ from src.flask.supabase.topic import (
 )
 import json
 from datetime import datetime
+from functools import lru_cache
 
 from src.flask.supabase.transcript import (
     get_transcript,
@@ -53,14 +61,12 @@ from src.flask.models.conversation_models import (
     ChatMessage,
 )
 from src.flask.supabase.utils import (
-    insert_transcript_data_async,
+    HISTORY_MAX_PAGE_SIZE,
+    HISTORY_PAGE_SIZE,
     load_conversation_history,
 )
-
-UPLOAD_FOLDER = "uploads"
-
-# Ensure upload folder exists
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+from src.flask.jobs import create_mindmap_job, get_job_status, start_workers
+from src.flask.uploads import remove_upload, spool_upload
 
 llm = ChatOpenAI(model="gpt-4o-mini", temperature=1, max_completion_tokens=500)
 app = Flask(__name__)
@@ -73,6 +79,12 @@ CORS(
 )
 
 
+@lru_cache(maxsize=1)
+def get_chatbot():
+    """Compile the RAG agent once per process."""
+    return create_rag_agent(get_checkpointer(), llm, get_vectorstore())
+
+
 def serialize_auth_response(response: AuthResponse):
     return {
         "user": response.user.model_dump(mode="json"),
@@ -155,6 +167,7 @@ def handle_session():
 
 
 @app.route("/dashboard/mindmap", methods=["GET"])
+@require_auth
 def handle_mindmap_get():
     try:
         cards = get_user_mindmaps(request)
@@ -169,6 +182,7 @@ def handle_mindmap_get():
 
 
 @app.route("/dashboard/mindmap/search", methods=["GET"])
+@require_auth
 def handle_mindmap_search():
     try:
         request_tags = request.args.getlist("tags")
@@ -191,6 +205,7 @@ def handle_mindmap_search():
 
 
 @app.route("/dashboard/mindmap/<mindmap_id>", methods=["GET"])
+@require_auth
 def handle_mindmap_detail(mindmap_id: str):
     try:
         mindmap = get_mindmap_detail(request, mindmap_id)
@@ -205,6 +220,7 @@ def handle_mindmap_detail(mindmap_id: str):
 
 
 @app.route("/dashboard/mindmap/tags", methods=["GET"])
+@require_auth
 def handle_mindmap_tags():
     try:
         tags = get_tags(request)
@@ -216,33 +232,62 @@ def handle_mindmap_tags():
 
 
 @app.route("/dashboard/mindmap", methods=["POST"])
-async def handle_mindmap_create():
+@require_auth
+def handle_mindmap_create():
     try:
         file = request.files.get("file")
         if not file:
             return jsonify({"message": "File is required"}), 400
 
-        file_bytes = file.read()
         title = request.form.get("title")
         description = request.form.get("description")
         date = request.form.get("date")
-        tags = json.loads(request.form.get("tags", "[]"))
+        if not title or not description or not date:
+            return jsonify({"message": "Title, description and date are required"}), 400
+        try:
+            tags = json.loads(request.form.get("tags", "[]"))
+        except ValueError:
+            tags = None
+        if not isinstance(tags, list):
+            return jsonify({"message": "Tags must be a JSON list"}), 400
+
+        file_path, file_hash = spool_upload(file)
+        try:
+            job = create_mindmap_job(
+                file_path,
+                file_hash,
+                file.filename,
+                title,
+                description,
+                date,
+                tags,
+                g.user_id,
+            )
+        except Exception:
+            # The job was never queued, so no worker will clean up the upload.
+            remove_upload(file_path)
+            raise
 
-        transcript_state = TranscriptState(
-            file=file_bytes,
-            file_name=file.filename,
+        return (
+            jsonify(
+                {"message": "Mindmap job queued", "data": job.model_dump(mode="json")}
+            ),
+            202,
         )
+    except Exception as e:
+        print(e)
+        return jsonify({"message": "An unexpected error occurred"}), 500
 
-        result_dict = await transcript_graph.ainvoke(transcript_state)
-
-        result = TranscriptState(**result_dict)
-
-        mindmap = await insert_transcript_data_async(
-            request, result, title, description, date, tags
-        )
 
+@app.route("/dashboard/mindmap/jobs/<job_id>", methods=["GET"])
+@require_auth
+def handle_mindmap_job(job_id: str):
+    try:
+        job = get_job_status(job_id)
+        if not job or job.user_id != g.user_id:
+            return jsonify({"message": "Job not found"}), 404
         return (
-            jsonify({"message": "Mindmap created", "data": mindmap.model_dump()}),
+            jsonify({"message": "Mindmap job found", "data": job.model_dump(mode="json")}),
             200,
         )
     except Exception as e:
@@ -251,6 +296,7 @@ async def handle_mindmap_create():
 
 
 @app.route("/mindmap/<mindmap_id>", methods=["GET"])
+@require_auth
 def handle_mindmap_get_detail(mindmap_id: str):
     try:
         mindmap = get_mindmap_detail(request, mindmap_id)
@@ -264,6 +310,7 @@ def handle_mindmap_get_detail(mindmap_id: str):
 
 
 @app.route("/mindmap/<mindmap_id>/topics", methods=["GET"])
+@require_auth
 def handle_mindmap_topics(mindmap_id: str):
     try:
         topics = get_topics(request, mindmap_id)
@@ -282,6 +329,7 @@ def handle_mindmap_topics(mindmap_id: str):
 
 
 @app.route("/mindmap/<mindmap_id>/transcript", methods=["GET"])
+@require_auth
 def handle_transcript_get_detail(mindmap_id: str):
     try:
         transcript = get_transcript(request, mindmap_id)
@@ -300,6 +348,7 @@ def handle_transcript_get_detail(mindmap_id: str):
 
 
 @app.route("/topic/<topic_id>", methods=["GET"])
+@require_auth
 def handle_topic_get_detail(topic_id: str):
     try:
         topic = get_topic_detail(request, topic_id)
@@ -313,6 +362,7 @@ def handle_topic_get_detail(topic_id: str):
 
 
 @app.route("/mindmap/<mindmap_id>/questions", methods=["GET"])
+@require_auth
 def handle_mindmap_questions(mindmap_id: str):
     try:
         questions = get_questions(request, mindmap_id)
@@ -331,6 +381,7 @@ def handle_mindmap_questions(mindmap_id: str):
 
 
 @app.route("/conversations", methods=["POST"])
+@require_auth
 def handle_create_conversation():
     """Create a new conversation"""
     try:
@@ -357,6 +408,7 @@ def handle_create_conversation():
 
 
 @app.route("/conversations", methods=["GET"])
+@require_auth
 def handle_get_conversations():
     """Get all conversations for the current user"""
     try:
@@ -368,13 +420,35 @@ def handle_get_conversations():
 
 
 @app.route("/conversations/<conversation_id>", methods=["GET"])
+@require_auth
 async def handle_get_conversation(conversation_id: str):
-    """Get conversation history (last 10 messages) and load into Redis"""
+    """Get a page of the conversation's history, latest page by default"""
     try:
-        history = await load_conversation_history(conversation_id)
+        limit = request.args.get("limit", HISTORY_PAGE_SIZE, type=int)
+        offset = request.args.get("offset", 0, type=int)
+        if limit < 1 or offset < 0:
+            return jsonify({"message": "Invalid limit or offset"}), 400
+        limit = min(limit, HISTORY_MAX_PAGE_SIZE)
+
+        if not get_conversation(request, conversation_id):
+            return jsonify({"message": "Conversation not found"}), 404
+
+        history, has_more = await load_conversation_history(
+            conversation_id, limit, offset
+        )
 
         return (
-            jsonify({"message": "Conversation history found", "data": history}),
+            jsonify(
+                {
+                    "message": "Conversation history found",
+                    "data": history,
+                    "pagination": {
+                        "limit": limit,
+                        "offset": offset,
+                        "has_more": has_more,
+                    },
+                }
+            ),
             200,
         )
 
@@ -383,80 +457,133 @@ async def handle_get_conversation(conversation_id: str):
         return jsonify({"message": "An unexpected error occurred"}), 500
 
 
+def latest_exchange(messages) -> list[ChatMessageResponse]:
+    """Get the last human message and AI reply from the agent state."""
+    human_message = None
+    ai_message = None
+
+    for msg in reversed(visible_messages(messages)):
+        if msg.type == "human" and human_message is None:
+            human_message = msg
+        elif msg.type == "ai" and ai_message is None:
+            ai_message = msg
+
+        if human_message and ai_message:
+            break
+
+    return [
+        ChatMessageResponse.from_message(human_message),
+        ChatMessageResponse.from_message(ai_message),
+    ]
+
+
+def prepare_chat(chat_request: ChatMessage):
+    """Resolve the conversation and build the agent input and config."""
+    conversation = get_conversation(request, chat_request.conversation_id)
+    if not conversation:
+        return None, None
+
+    config = rag_agent_config(
+        g.user_id, chat_request.conversation_id, conversation.transcript_id
+    )
+
+    context = conversation.transcript_id if conversation.transcript_id else ""
+    messages = [
+        HumanMessage(
+            content=chat_request.message,
+            additional_kwargs={"transcript_id": context} if context else {},
+        )
+    ]
+
+    initial_state = ChatBotState(
+        messages=messages,
+    )
+    return initial_state, config
+
+
 @app.route("/chat", methods=["POST"])
+@require_auth
 def handle_send_message():
     """Handle chat messages with conversation persistence"""
     try:
         data = request.json
         chat_request = ChatMessage(**data)
 
-        conversation = get_conversation(request, chat_request.conversation_id)
-        if not conversation:
+        initial_state, config = prepare_chat(chat_request)
+        if initial_state is None:
             return jsonify({"message": "Conversation not found"}), 404
 
-        client = get_client(request)
-        auth_token = get_auth_token(request)
+        result = get_chatbot().invoke(initial_state, config=config)
 
-        user_id = client.auth.get_user(auth_token).user.id
+        exchange = latest_exchange(result["messages"])
 
-        write_config = {
-            "configurable": {
-                "thread_id": chat_request.conversation_id,
-                "checkpoint_ns": "",
-            }
-        }
+        return (
+            jsonify(
+                {
+                    "message": "Chat processed successfully",
+                    "data": [message.model_dump() for message in exchange],
+                }
+            ),
+            200,
+        )
 
-        context = conversation.transcript_id if conversation.transcript_id else ""
-        messages = [
-            HumanMessage(
-                content=chat_request.message,
-                additional_kwargs={"transcript_id": context} if context else {},
-            )
-        ]
+    except Exception as e:
+        print(f"Error in chat: {e}")
+        return jsonify({"message": "An unexpected error occurred"}), 500
 
-        with get_checkpoint() as checkpoint, get_vectorstore_context() as vectorstore:
-            initial_state = ChatBotState(
-                messages=messages,
-            )
-            chatbot = create_rag_agent(
-                checkpoint, llm, vectorstore, user_id, chat_request.conversation_id
-            )
-            result = chatbot.invoke(initial_state, config=write_config)
 
-        messages = result["messages"]
+_streaming_chatbot = None
 
-        human_message = None
-        ai_message = None
 
-        for msg in reversed(messages):
-            if msg.type == "human" and human_message is None:
-                human_message = msg
-            elif msg.type == "ai" and ai_message is None:
-                ai_message = msg
+async def get_streaming_chatbot():
+    """Compile the async RAG agent once, on the background event loop."""
+    global _streaming_chatbot
+    if _streaming_chatbot is None:
+        checkpoint = AsyncPostgresSaver(await get_async_checkpoint_pool())
+        _streaming_chatbot = create_rag_agent(checkpoint, llm, get_vectorstore())
+    return _streaming_chatbot
 
-            if human_message and ai_message:
-                break
 
-        sent_message = ChatMessageResponse(
-            message=human_message.content,
-            type=human_message.type,
-            id=human_message.id,
-        )
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
 
-        response_message = ChatMessageResponse(
-            message=ai_message.content,
-            type=ai_message.type,
-            id=ai_message.id,
+
+async def stream_chat(initial_state: ChatBotState, config: dict):
+    try:
+        chatbot = await get_streaming_chatbot()
+        async for event, data in astream_chat_events(chatbot, initial_state, config):
+            yield format_sse(event, data)
+
+        state = await chatbot.aget_state(config)
+        exchange = latest_exchange(state.values["messages"])
+        yield format_sse(
+            "done",
+            {
+                "message": "Chat processed successfully",
+                "data": [message.model_dump() for message in exchange],
+            },
         )
+    except Exception as e:
+        print(f"Error in chat stream: {e}")
+        yield format_sse("error", {"message": "An unexpected error occurred"})
 
-        return (
-            jsonify(
-                {
-                    "message": "Chat processed successfully",
-                    "data": [sent_message.model_dump(), response_message.model_dump()],
-                }
-            ),
-            200,
+
+@app.route("/chat/stream", methods=["POST"])
+@require_auth
+def handle_stream_message():
+    """Handle chat messages, streaming tool activity and tokens as Server-Sent Events"""
+    try:
+        data = request.json
+        chat_request = ChatMessage(**data)
+
+        initial_state, config = prepare_chat(chat_request)
+        if initial_state is None:
+            return jsonify({"message": "Conversation not found"}), 404
+
+        return Response(
+            iterate_in_background(stream_chat(initial_state, config)),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
         )
 
     except Exception as e:
@@ -464,7 +591,18 @@ def handle_send_message():
         return jsonify({"message": "An unexpected error occurred"}), 500
 
 
+@app.route("/metrics/llm-cache", methods=["GET"])
+@require_auth
+def handle_llm_cache_metrics():
+    stats = llm_cache.stats() if llm_cache else {"enabled": False}
+    return jsonify({"message": "LLM cache stats", "data": stats}), 200
+
+
 def main():
+    get_supabase_config()
+    warm_connections()
+    get_chatbot()
+    start_workers()
     app.run(port=5000, debug=True, use_reloader=False)
 
 
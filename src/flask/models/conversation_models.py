@@ -1,4 +1,5 @@
 from datetime import datetime
+from langchain_core.messages import BaseMessage
 from pydantic import BaseModel
 from typing import Optional
 
@@ -26,3 +27,12 @@ class ChatMessageResponse(BaseModel):
     id: str
     message: str
     type: str
+
+    @classmethod
+    def from_message(cls, message: BaseMessage) -> "ChatMessageResponse":
+        """The one serialization of a chat message used by every endpoint."""
+        return cls(
+            id=message.id or message.additional_kwargs.get("id", ""),
+            message=message.content,
+            type=message.type,
+        )
@@ -0,0 +1,29 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+
+
+class MindMapJob(BaseModel):
+    id: str
+    file_path: str
+    file_hash: str
+    file_name: str
+    title: str
+    description: str
+    date: str
+    tags: List[str] = Field(default_factory=list)
+    user_id: str
+
+
+class JobStatus(BaseModel):
+    id: str
+    user_id: Optional[str] = None
+    status: str
+    current_node: Optional[str] = None
+    completed_nodes: List[str] = Field(default_factory=list)
+    cached: bool = False
+    branch_timings: Dict[str, float] = Field(default_factory=dict)
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
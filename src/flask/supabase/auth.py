@@ -1,7 +1,36 @@
+import hashlib
+import inspect
+import json
+import os
+import time
+from functools import lru_cache, wraps
 from typing import TypedDict, NotRequired
+import jwt
+from dotenv import load_dotenv
 from gotrue.types import AuthResponse
-from flask import Request
-from .client import get_client
+from flask import Request, g, jsonify, request
+from src.agent.cache import MemoryCache
+from .client import (
+    create_session_client,
+    get_client_from_auth_token,
+    get_supabase_config,
+)
+
+load_dotenv()
+
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+JWKS_CACHE_TTL = int(os.getenv("JWKS_CACHE_TTL", "600"))
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "4096"))
+JWT_ALGORITHMS = ["HS256", "RS256", "ES256"]
+
+# Claims from remote validation, keyed by token hash.
+remote_claims_cache = MemoryCache(max_size=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+
+
+class AuthError(Exception):
+    pass
 
 
 class UserModel(TypedDict):
@@ -13,7 +42,7 @@ class UserModel(TypedDict):
 
 def signup(user: UserModel) -> AuthResponse:
     """Sign up a new user"""
-    client = get_client()
+    client = create_session_client()
     metadata = {}
     if "firstName" in user and user["firstName"] is not None:
         metadata["firstName"] = user["firstName"]
@@ -31,17 +60,137 @@ def signup(user: UserModel) -> AuthResponse:
 
 def signin(email: str, password: str) -> AuthResponse:
     """Sign in an existing user"""
-    client = get_client()
+    client = create_session_client()
     return client.auth.sign_in_with_password({"email": email, "password": password})
 
 
 def signout(request: Request):
     """Sign out the current user"""
-    client = get_client(request)
+    client = create_session_client(request)
     return client.auth.sign_out()
 
 
 def refresh_session(request: Request, refresh_token: str):
     """Get the current session from the request"""
-    client = get_client(request)
+    client = create_session_client(request)
     return client.auth.refresh_session(refresh_token)
+
+
+@lru_cache(maxsize=1)
+def get_jwks_client() -> jwt.PyJWKClient:
+    """JWKS client for the project's asymmetric signing keys, cached in process."""
+    url, _ = get_supabase_config()
+    return jwt.PyJWKClient(
+        f"{url}/auth/v1/.well-known/jwks.json", lifespan=JWKS_CACHE_TTL
+    )
+
+
+def _signing_key(token: str, algorithm: str):
+    if algorithm == "HS256":
+        return SUPABASE_JWT_SECRET
+    return get_jwks_client().get_signing_key_from_jwt(token).key
+
+
+def _verify_remotely(token: str) -> dict:
+    """
+    Validate the token with Supabase Auth. Used only when it cannot be
+    verified locally; results are cached for a short TTL.
+    """
+    key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    cached = remote_claims_cache.get(key)
+    if cached is not None:
+        return json.loads(cached)
+
+    try:
+        user = get_client_from_auth_token(token).auth.get_user(token).user
+    except Exception as e:
+        raise AuthError("Invalid token") from e
+    if user is None:
+        raise AuthError("Invalid token")
+
+    claims = {"sub": user.id, "email": user.email, "role": user.role, "aud": user.aud}
+    # Never cache past the token's own expiry.
+    expires_at = jwt.decode(token, options={"verify_signature": False}).get("exp")
+    ttl = AUTH_CACHE_TTL
+    if expires_at:
+        ttl = min(ttl, int(expires_at - time.time()))
+    if ttl > 0:
+        remote_claims_cache.set(key, json.dumps(claims), ttl=ttl)
+    return claims
+
+
+def verify_token(token: str) -> dict:
+    """
+    Verify a Supabase access token and return its claims.
+    Signature, expiry and audience are checked locally with the JWT secret
+    (HS256) or the project's JWKS; if neither is available the token is
+    validated remotely.
+    """
+    try:
+        algorithm = jwt.get_unverified_header(token).get("alg")
+    except jwt.InvalidTokenError as e:
+        raise AuthError("Invalid token") from e
+    if algorithm not in JWT_ALGORITHMS:
+        raise AuthError("Invalid token")
+
+    try:
+        key = _signing_key(token, algorithm)
+    except jwt.PyJWKClientError as e:
+        print(f"Warning: JWKS unavailable, validating token remotely: {e}")
+        key = None
+    if key is None:
+        return _verify_remotely(token)
+
+    try:
+        return jwt.decode(
+            token,
+            key,
+            algorithms=[algorithm],
+            audience=SUPABASE_JWT_AUDIENCE,
+            options={"require": ["exp", "sub"]},
+        )
+    except jwt.ExpiredSignatureError as e:
+        raise AuthError("Token expired") from e
+    except jwt.InvalidTokenError as e:
+        raise AuthError("Invalid token") from e
+
+
+def _authenticate():
+    """Verify the request's bearer token and store the user on flask.g."""
+    header = request.headers.get("Authorization", "")
+    if not header.startswith("Bearer "):
+        return jsonify({"message": "Authorization required"}), 401
+    try:
+        claims = verify_token(header.removeprefix("Bearer ").strip())
+    except AuthError as e:
+        return jsonify({"message": str(e)}), 401
+
+    g.claims = claims
+    g.user_id = claims["sub"]
+    return None
+
+
+def require_auth(view):
+    """
+    Reject requests without a valid bearer token. The verified user id and
+    claims are available to the view as g.user_id and g.claims.
+    """
+    if inspect.iscoroutinefunction(view):
+
+        @wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            error = _authenticate()
+            if error is not None:
+                return error
+            return await view(*args, **kwargs)
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        error = _authenticate()
+        if error is not None:
+            return error
+        return view(*args, **kwargs)
+
+    return wrapper
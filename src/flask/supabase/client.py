@@ -1,12 +1,20 @@
 from supabase import AsyncClient, ClientOptions, create_client, acreate_client, Client
+from postgrest import AsyncPostgrestClient, SyncPostgrestClient
+import asyncio
 import os
+import threading
+from functools import lru_cache
+from typing import Optional, Union
 from dotenv import load_dotenv
 from flask import Request
+from src.agent.runtime import get_background_loop
 
+load_dotenv()
 
+
+@lru_cache(maxsize=1)
 def get_supabase_config():
-    """Get Supabase configuration, ensuring .env is loaded fresh each time."""
-    load_dotenv()  # Reload environment variables
+    """Get Supabase configuration, loaded once per process."""
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_KEY")
 
@@ -18,64 +26,201 @@ def get_supabase_config():
     return url, key
 
 
-def get_client(request: Request = None) -> Client:
+@lru_cache(maxsize=1)
+def get_supabase_service_key() -> str:
     """
-    Create a Supabase client for the current request.
-    If request is provided and has Authorization header, creates an authenticated client.
-    Otherwise returns an anonymous client.
+    Service role key for background work that acts on behalf of a user
+    without their access token, such as persisting queued mindmap jobs.
     """
-    url, key = get_supabase_config()
+    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not key:
+        raise ValueError("Missing Supabase configuration: SUPABASE_SERVICE_ROLE_KEY")
+    return key
 
-    options = None
+
+def _client_options() -> ClientOptions:
+    """
+    Options for shared clients. Sessions are never persisted or refreshed on a
+    shared client, bearer tokens are only applied as request headers.
+    """
+    return ClientOptions(auto_refresh_token=False, persist_session=False)
+
+
+def _auth_header(auth_token: Optional[str]) -> Optional[str]:
+    if not auth_token:
+        return None
+    # Ensure token has Bearer prefix, but don't double-add it
+    if not auth_token.startswith("Bearer "):
+        auth_token = f"Bearer {auth_token}"
+    return auth_token
+
+
+def _request_auth_header(request: Request = None) -> Optional[str]:
     if request and request.headers.get("Authorization"):
-        auth_token = request.headers["Authorization"].replace("Bearer ", "")
-        options = ClientOptions(headers={"Authorization": f"Bearer {auth_token}"})
+        return _auth_header(request.headers["Authorization"].replace("Bearer ", ""))
+    return None
 
-    return create_client(url, key, options)
 
+class TokenClient:
+    """
+    A shared Supabase client seen through one bearer token. Table and RPC
+    calls go through a PostgREST client that carries the token in its own
+    headers and reuses the shared client's HTTP session, so no shared state
+    is modified per request.
+    """
+
+    def __init__(self, client, postgrest):
+        self.client = client
+        self.postgrest = postgrest
+        self.auth = client.auth
+
+    def table(self, table_name: str):
+        return self.postgrest.from_(table_name)
+
+    def from_(self, table_name: str):
+        return self.postgrest.from_(table_name)
+
+    def rpc(self, fn: str, params: Optional[dict] = None, **kwargs):
+        return self.postgrest.rpc(fn, params or {}, **kwargs)
+
+
+def _token_headers(client, auth_header: str) -> dict:
+    return {**client.options.headers, "Authorization": auth_header}
 
-async def get_async_client(request: Request = None) -> AsyncClient:
+
+class SupabaseClientPool:
     """
-    Create an async Supabase client for the current request.
+    One shared Supabase client per base config. Authenticated requests get a
+    TokenClient over it, so every token shares the same HTTP connections.
     """
-    url, key = get_supabase_config()
 
-    options = None
-    if request and request.headers.get("Authorization"):
-        auth_token = request.headers["Authorization"].replace("Bearer ", "")
-        options = ClientOptions(headers={"Authorization": f"Bearer {auth_token}"})
+    def __init__(self):
+        self._clients: dict = {}
+        self._lock = threading.Lock()
+
+    def base(self) -> Client:
+        url, key = get_supabase_config()
+        with self._lock:
+            client = self._clients.get((url, key))
+            if client is None:
+                client = create_client(url, key, _client_options())
+                self._clients[(url, key)] = client
+            return client
+
+    def get(self, auth_header: Optional[str] = None) -> Union[Client, TokenClient]:
+        client = self.base()
+        if not auth_header:
+            return client
+        postgrest = SyncPostgrestClient(
+            str(client.rest_url),
+            headers=_token_headers(client, auth_header),
+            schema=client.options.schema,
+            http_client=client.postgrest.session,
+        )
+        return TokenClient(client, postgrest)
+
+
+class AsyncSupabaseClientPool:
+    """
+    Async counterpart of SupabaseClientPool. Async HTTP sessions are bound to
+    the event loop that created them, so async clients live on the background
+    loop only (ingestion jobs). Flask views, which run in per-request loops,
+    use the sync clients instead.
+    """
+
+    def __init__(self):
+        self._clients: dict = {}
+
+    async def base(self, key: Optional[str] = None) -> AsyncClient:
+        url, anon_key = get_supabase_config()
+        key = key or anon_key
+        if asyncio.get_running_loop() is not get_background_loop():
+            raise RuntimeError(
+                "Async Supabase clients are only available on the background loop, "
+                "use run_in_background or the sync client"
+            )
+
+        client = self._clients.get((url, key))
+        if client is None:
+            client = await acreate_client(url, key, _client_options())
+            # Only the background loop touches the pool, no lock needed.
+            client = self._clients.setdefault((url, key), client)
+        return client
+
+    async def get(
+        self, auth_header: Optional[str] = None
+    ) -> Union[AsyncClient, TokenClient]:
+        client = await self.base()
+        if not auth_header:
+            return client
+        postgrest = AsyncPostgrestClient(
+            str(client.rest_url),
+            headers=_token_headers(client, auth_header),
+            schema=client.options.schema,
+            http_client=client.postgrest.session,
+        )
+        return TokenClient(client, postgrest)
 
-    return await acreate_client(url, key, options)
 
+client_pool = SupabaseClientPool()
+async_client_pool = AsyncSupabaseClientPool()
 
-def get_client_from_auth_token(auth_token: str) -> Client:
+
+def get_client(request: Request = None) -> Union[Client, TokenClient]:
     """
-    Create a Supabase client for the current request.
-    If request is provided and has Authorization header, creates an authenticated client.
-    Otherwise returns an anonymous client.
+    Get a Supabase client for the current request.
+    If request is provided and has Authorization header, returns an authenticated client.
+    Otherwise returns the shared anonymous client.
     """
-    url, key = get_supabase_config()
+    return client_pool.get(_request_auth_header(request))
 
-    # Ensure token has Bearer prefix, but don't double-add it
-    if not auth_token.startswith("Bearer "):
-        auth_token = f"Bearer {auth_token}"
 
-    options = ClientOptions(headers={"Authorization": auth_token})
-    return create_client(url, key, options)
+async def get_async_client(request: Request = None) -> Union[AsyncClient, TokenClient]:
+    """
+    Get an async Supabase client for the current request. Must be called on
+    the background loop.
+    """
+    return await async_client_pool.get(_request_auth_header(request))
 
 
-async def get_async_client_from_auth_token(auth_token: str) -> AsyncClient:
+def get_client_from_auth_token(auth_token: str) -> Union[Client, TokenClient]:
     """
-    Create an async Supabase client for the current request.
+    Get a Supabase client authenticated with the given token.
+    """
+    return client_pool.get(_auth_header(auth_token))
+
+
+async def get_async_client_from_auth_token(
+    auth_token: str,
+) -> Union[AsyncClient, TokenClient]:
+    """
+    Get an async Supabase client authenticated with the given token.
+    """
+    return await async_client_pool.get(_auth_header(auth_token))
+
+
+async def get_async_service_client() -> AsyncClient:
+    """
+    Get an async Supabase client authenticated with the service role key.
+    It bypasses row level security, so callers must scope writes to a user.
+    """
+    return await async_client_pool.base(get_supabase_service_key())
+
+
+def create_session_client(request: Request = None) -> Client:
+    """
+    Create a dedicated, non-pooled Supabase client.
+    Used for auth flows (sign in, sign up, refresh, sign out) which store a
+    session on the client and must never leak it into the shared pool.
     """
     url, key = get_supabase_config()
 
-    # Ensure token has Bearer prefix, but don't double-add it
-    if not auth_token.startswith("Bearer "):
-        auth_token = f"Bearer {auth_token}"
+    options = None
+    auth_header = _request_auth_header(request)
+    if auth_header:
+        options = ClientOptions(headers={"Authorization": auth_header})
 
-    options = ClientOptions(headers={"Authorization": auth_token})
-    return await acreate_client(url, key, options)
+    return create_client(url, key, options)
 
 
 def get_auth_token(request: Request) -> str:
@@ -2,77 +2,60 @@ from typing import List
 from datetime import datetime
 from flask import Request
 
+from src.agent.state import TranscriptState
 from src.flask.models.mindmap_models import MindMap, MindMapResponse, MindMapWithTags
-from .client import get_async_client, get_client
+from .client import get_async_service_client, get_client
 
 
-def insert_mindmap(
-    request: Request,
+async def insert_mindmap_from_transcript_async(
+    user_id: str,
+    transcript_state: TranscriptState,
     title: str,
     description: str,
     date: str,
-    participants: List[str] = [],
-    transcript_id: str = None,
-) -> MindMap:
+    tags: List[str],
+) -> tuple[MindMapResponse, str]:
     """
-    Insert a new mindmap for the current user.
+    Insert the transcript, mindmap, tags, questions, topics and content in a
+    single transaction through the insert_transcript_data RPC.
+    Runs with the service role on behalf of user_id, since queued jobs do not
+    carry the user's access token. Returns the mindmap and the new transcript id.
     """
-    client = get_client(request)
-
     parsed_date = datetime.fromisoformat(date.replace("Z", "+00:00"))
 
-    data = {
+    payload = {
+        "user_id": user_id,
+        "transcript": transcript_state.transcript,
         "title": title,
         "description": description,
         "date": parsed_date.isoformat(),
-        "participants": participants,
-        "transcript_id": transcript_id,
+        "participants": transcript_state.participants,
+        "tags": tags,
+        "questions": transcript_state.questions,
+        "topics": [
+            {
+                "title": topic.title,
+                "connected_topics": topic.connected_topics,
+                "content": [
+                    {"speaker": content.speaker, "text": content.text}
+                    for content in topic.content
+                ],
+            }
+            for topic in transcript_state.topics
+        ],
     }
 
-    result = client.table("MindMap").insert(data).execute()
-    data = result.data[0] if result.data else None
-
-    return MindMap(
+    client = await get_async_service_client()
+    result = await client.rpc("insert_transcript_data", {"payload": payload}).execute()
+    data = result.data
+    mindmap = MindMapResponse(
         id=data["id"],
-        user_id=data["user_id"],
         title=data["title"],
-        participants=data["participants"],
         description=data["description"],
-        created_at=data["created_at"],
-        date=data["date"],
-    )
-
-
-async def insert_mindmap_async(
-    request: Request,
-    title: str,
-    description: str,
-    date: str,
-    participants: List[str] = [],
-    transcript_id: str = None,
-) -> MindMap:
-    parsed_date = datetime.fromisoformat(date.replace("Z", "+00:00"))
-
-    data = {
-        "title": title,
-        "description": description,
-        "date": parsed_date.isoformat(),
-        "participants": participants,
-        "transcript_id": transcript_id,
-    }
-    client = await get_async_client(request)
-    result = await client.table("MindMap").insert(data).execute()
-    data = result.data[0] if result.data else None
-
-    return MindMap(
-        id=data["id"],
-        user_id=data["user_id"],
-        title=data["title"],
-        participants=data["participants"],
-        description=data["description"],
-        created_at=data["created_at"],
         date=data["date"],
+        tags=data["tags"],
     )
+    return mindmap, data["transcript_id"]
 
 
 def get_user_mindmaps(request: Request) -> List[MindMapResponse]:
@@ -2,101 +2,42 @@ import os
 from typing import List
 from flask import Request
 from dotenv import load_dotenv
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from src.agent.state import TranscriptChunk
 from src.flask.models.transcript_models import Transcript
-from .client import get_async_client, get_auth_token, get_client
-from src.agent.connection import get_vectorstore, get_vectorstore_context
+from .client import get_client
+from src.agent.indexing import index_chunks
 
 load_dotenv()
 
-CHUNK_SIZE = 1500
-CHUNK_OVERLAP = 200
 
-
-def insert_transcript(request: Request, text: str) -> Transcript:
+async def insert_transcript_as_vector_async(
+    chunks: List[TranscriptChunk], transcript_id: str, user_id: str
+):
     """
-    Insert a new content for the current user.
+    Index transcript chunks produced by the transcript graph for the
+    already-verified user.
     """
-    data = {
-        "text": text,
-    }
-
-    try:
-        client = get_client(request)
-        result = client.table("Transcript").insert(data).execute()
-        data = result.data[0] if result.data else None
-        return Transcript(
-            id=data["id"],
-            user_id=data["user_id"],
-            text=data["text"],
-        )
-    except Exception as e:
-        print(f"Error inserting transcript: {e}")
-        print(f"Error type: {type(e)}")
-        if hasattr(e, "details"):
-            print(f"Error details: {e.details}")
-        raise e
+    await index_chunks(
+        [chunk.text for chunk in chunks],
+        _chunk_metadatas(chunks, transcript_id, user_id),
+    )
 
 
-async def insert_transcript_async(request: Request, text: str) -> Transcript:
-    try:
-        data = {
-            "text": text,
+def _chunk_metadatas(
+    chunks: List[TranscriptChunk], transcript_id: str, user_id: str
+) -> List[dict]:
+    """Metadata that points each vector back to its span of the transcript."""
+    return [
+        {
+            "transcript_id": transcript_id,
+            "user_id": user_id,
+            "chunk_index": index,
+            "start": chunk.start,
+            "end": chunk.end,
+            "speakers": chunk.speakers,
         }
-        client = await get_async_client(request)
-        result = await client.table("Transcript").insert(data).execute()
-        data = result.data[0] if result.data else None
-        return Transcript(
-            id=data["id"],
-            user_id=data["user_id"],
-            text=data["text"],
-        )
-    except Exception as e:
-        print(f"Error inserting transcript: {e}")
-        print(f"Error type: {type(e)}")
-        if hasattr(e, "details"):
-            print(f"Error details: {e.details}")
-        raise e
-
-
-def insert_transcript_as_vector(request: Request, text: str, transcript_id: str):
-    chunks = _chunk_transcript(text)
-    client = get_client(request)
-    auth_token = get_auth_token(request)
-    user_id = client.auth.get_user(auth_token).user.id
-
-    metadata = {
-        "transcript_id": transcript_id,
-        "user_id": user_id,
-    }
-
-    with get_vectorstore() as vectorstore:
-        vectorstore.add_texts(chunks, metadatas=[metadata] * len(chunks))
-
-
-async def insert_transcript_as_vector_async(
-    request: Request, text: str, transcript_id: str
-):
-    chunks = _chunk_transcript(text)
-    client = await get_async_client(request)
-    auth_token = get_auth_token(request)
-    user_response = await client.auth.get_user(auth_token)
-    user_id = user_response.user.id
-
-    metadata = {
-        "transcript_id": transcript_id,
-        "user_id": user_id,
-    }
-    with get_vectorstore_context() as vectorstore:
-        vectorstore.add_texts(chunks, metadatas=[metadata] * len(chunks))
-
-
-def _chunk_transcript(text: str) -> List[str]:
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-    )
-    return text_splitter.split_text(text)
+        for index, chunk in enumerate(chunks)
+    ]
 
 
 def get_transcript(request: Request, mindmap_id: str) -> Transcript:
@@ -0,0 +1,52 @@
+import hashlib
+import os
+import uuid
+from dotenv import load_dotenv
+from werkzeug.datastructures import FileStorage
+from werkzeug.utils import secure_filename
+
+load_dotenv()
+
+# Ingestion workers read spooled uploads by path, so workers on other hosts
+# need UPLOAD_DIR on storage shared with the app, mounted at the same path.
+UPLOAD_DIR = os.getenv("UPLOAD_DIR")
+UPLOAD_FOLDER = UPLOAD_DIR or "uploads"
+SPOOL_CHUNK_SIZE = 64 * 1024
+
+# Ensure upload folder exists
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+
+def spool_upload(file: FileStorage) -> tuple[str, str]:
+    """
+    Stream an uploaded file to UPLOAD_FOLDER in fixed-size chunks, hashing it
+    on the way so the whole file is never held in memory.
+    Returns the spooled file path and its SHA-256 hex digest.
+    """
+    name = secure_filename(file.filename or "") or "upload"
+    path = os.path.abspath(os.path.join(UPLOAD_FOLDER, f"{uuid.uuid4()}_{name}"))
+    digest = hashlib.sha256()
+
+    try:
+        with open(path, "wb") as destination:
+            while True:
+                chunk = file.stream.read(SPOOL_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                destination.write(chunk)
+    except Exception:
+        remove_upload(path)
+        raise
+
+    return path, digest.hexdigest()
+
+
+def remove_upload(path: str) -> None:
+    """Delete a spooled upload once it has been processed."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Warning: Error removing upload {path}: {e}")
@@ -0,0 +1,91 @@
+-- Inserts a processed transcript and everything derived from it in one
+-- transaction: Transcript, MindMap, Tags, Question, Topic and Content.
+--
+-- payload:
+-- {
+--   "transcript": text,
+--   "title": text,
+--   "description": text,
+--   "date": timestamptz,
+--   "participants": [text],
+--   "tags": [text],
+--   "questions": [text],
+--   "topics": [
+--     {"title": text, "connected_topics": [text],
+--      "content": [{"speaker": text, "text": text}]}
+--   ]
+-- }
+--
+-- Runs as the calling user (security invoker) so row level security and
+-- the user_id column defaults apply exactly as for direct inserts.
+-- Returns the MindMapResponse fields plus transcript_id.
+create or replace function public.insert_transcript_data(payload jsonb)
+returns jsonb
+language plpgsql
+security invoker
+set search_path = public
+as $$
+declare
+  v_transcript_id "Transcript".id%type;
+  v_mindmap "MindMap"%rowtype;
+  v_topic jsonb;
+  v_topic_id "Topic".id%type;
+  v_tags jsonb;
+begin
+  insert into "Transcript" (text)
+  values (payload ->> 'transcript')
+  returning id into v_transcript_id;
+
+  insert into "MindMap" (title, description, date, participants, transcript_id)
+  values (
+    payload ->> 'title',
+    payload ->> 'description',
+    (payload ->> 'date')::timestamptz,
+    array(
+      select jsonb_array_elements_text(coalesce(payload -> 'participants', '[]'::jsonb))
+    ),
+    v_transcript_id
+  )
+  returning * into v_mindmap;
+
+  insert into "Tags" (name, mindmap_id)
+  select tag, v_mindmap.id
+  from jsonb_array_elements_text(coalesce(payload -> 'tags', '[]'::jsonb)) as tag;
+
+  insert into "Question" (question, mindmap_id)
+  select question, v_mindmap.id
+  from jsonb_array_elements_text(coalesce(payload -> 'questions', '[]'::jsonb)) as question;
+
+  for v_topic in
+    select value from jsonb_array_elements(coalesce(payload -> 'topics', '[]'::jsonb))
+  loop
+    insert into "Topic" (title, mindmap_id, connected_topics)
+    values (
+      v_topic ->> 'title',
+      v_mindmap.id,
+      array(
+        select jsonb_array_elements_text(coalesce(v_topic -> 'connected_topics', '[]'::jsonb))
+      )
+    )
+    returning id into v_topic_id;
+
+    insert into "Content" (text, speaker, topic_id)
+    select content ->> 'text', content ->> 'speaker', v_topic_id
+    from jsonb_array_elements(coalesce(v_topic -> 'content', '[]'::jsonb)) as content;
+  end loop;
+
+  select coalesce(jsonb_agg(name), '[]'::jsonb)
+  into v_tags
+  from "Tags"
+  where mindmap_id = v_mindmap.id;
+
+  return jsonb_build_object(
+    'id', v_mindmap.id,
+    'title', v_mindmap.title,
+    'description', v_mindmap.description,
+    'date', v_mindmap.date,
+    'tags', v_tags,
+    'transcript_id', v_transcript_id
+  );
+end;
+$$;
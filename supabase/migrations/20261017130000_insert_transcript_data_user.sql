@@ -0,0 +1,87 @@
+-- insert_transcript_data for queued ingestion jobs.
+--
+-- Workers do not hold the user's access token, they call the function with
+-- the service role and name the owner in payload.user_id. A signed-in
+-- caller always writes as itself: payload.user_id is only honoured for the
+-- service role. Every row gets user_id set explicitly, since auth.uid() is
+-- null under the service role.
+create or replace function public.insert_transcript_data(payload jsonb)
+returns jsonb
+language plpgsql
+security invoker
+set search_path = public
+as $$
+declare
+  v_user_id uuid := coalesce(
+    auth.uid(),
+    case when auth.role() = 'service_role' then (payload ->> 'user_id')::uuid end
+  );
+  v_transcript_id "Transcript".id%type;
+  v_mindmap "MindMap"%rowtype;
+  v_topic jsonb;
+  v_topic_id "Topic".id%type;
+  v_tags jsonb;
+begin
+  if v_user_id is null then
+    raise exception 'insert_transcript_data requires a user';
+  end if;
+
+  insert into "Transcript" (text, user_id)
+  values (payload ->> 'transcript', v_user_id)
+  returning id into v_transcript_id;
+
+  insert into "MindMap" (title, description, date, participants, transcript_id, user_id)
+  values (
+    payload ->> 'title',
+    payload ->> 'description',
+    (payload ->> 'date')::timestamptz,
+    array(
+      select jsonb_array_elements_text(coalesce(payload -> 'participants', '[]'::jsonb))
+    ),
+    v_transcript_id,
+    v_user_id
+  )
+  returning * into v_mindmap;
+
+  insert into "Tags" (name, mindmap_id, user_id)
+  select tag, v_mindmap.id, v_user_id
+  from jsonb_array_elements_text(coalesce(payload -> 'tags', '[]'::jsonb)) as tag;
+
+  insert into "Question" (question, mindmap_id, user_id)
+  select question, v_mindmap.id, v_user_id
+  from jsonb_array_elements_text(coalesce(payload -> 'questions', '[]'::jsonb)) as question;
+
+  for v_topic in
+    select value from jsonb_array_elements(coalesce(payload -> 'topics', '[]'::jsonb))
+  loop
+    insert into "Topic" (title, mindmap_id, connected_topics, user_id)
+    values (
+      v_topic ->> 'title',
+      v_mindmap.id,
+      array(
+        select jsonb_array_elements_text(coalesce(v_topic -> 'connected_topics', '[]'::jsonb))
+      ),
+      v_user_id
+    )
+    returning id into v_topic_id;
+
+    insert into "Content" (text, speaker, topic_id, user_id)
+    select content ->> 'text', content ->> 'speaker', v_topic_id, v_user_id
+    from jsonb_array_elements(coalesce(v_topic -> 'content', '[]'::jsonb)) as content;
+  end loop;
+
+  select coalesce(jsonb_agg(name), '[]'::jsonb)
+  into v_tags
+  from "Tags"
+  where mindmap_id = v_mindmap.id;
+
+  return jsonb_build_object(
+    'id', v_mindmap.id,
+    'title', v_mindmap.title,
+    'description', v_mindmap.description,
+    'date', v_mindmap.date,
+    'tags', v_tags,
+    'transcript_id', v_transcript_id
+  );
+end;
+$$;
@@ -0,0 +1,4 @@
+import os
+
+# src.agent.connection builds the OpenAI embeddings client at import time.
+os.environ.setdefault("OPENAI_API_KEY", "test")
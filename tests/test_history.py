@@ -0,0 +1,148 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from src.agent import history
+from src.agent.history import ConversationHistoryStore
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args):
+            self.commands.append((name, args))
+            return self
+
+        return queue
+
+    def execute(self):
+        results = [getattr(self.redis, name)(*args) for name, args in self.commands]
+        self.commands = []
+        return results
+
+
+class FakeRedis:
+    """The list commands ConversationHistoryStore uses."""
+
+    def __init__(self):
+        self.lists = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def exists(self, key):
+        return int(key in self.lists)
+
+    def delete(self, key):
+        return int(self.lists.pop(key, None) is not None)
+
+    def expire(self, key, ttl):
+        return int(key in self.lists)
+
+    def rpush(self, key, *values):
+        self.lists.setdefault(key, []).extend(values)
+        return len(self.lists[key])
+
+    def rpushx(self, key, *values):
+        return self.rpush(key, *values) if key in self.lists else 0
+
+    def ltrim(self, key, start, end):
+        self.lists[key] = self.lrange(key, start, end)
+
+    def lrange(self, key, start, end):
+        values = self.lists.get(key, [])
+        length = len(values)
+        start = max(start + length if start < 0 else start, 0)
+        end = end + length if end < 0 else end
+        return values[start : end + 1]
+
+
+class FakeCheckpointer:
+    def __init__(self, messages):
+        self.messages = messages
+        self.reads = 0
+
+    def get(self, config):
+        self.reads += 1
+        return {"channel_values": {"messages": self.messages}}
+
+
+def conversation(count):
+    return [
+        HumanMessage(f"m{i}") if i % 2 == 0 else AIMessage(f"m{i}") for i in range(count)
+    ]
+
+
+@pytest.fixture
+def store(monkeypatch):
+    def make(message_count, max_messages=5):
+        redis = FakeRedis()
+        checkpointer = FakeCheckpointer(conversation(message_count))
+        monkeypatch.setattr(history, "get_redis", lambda: redis)
+        monkeypatch.setattr(history, "get_checkpointer", lambda: checkpointer)
+        return ConversationHistoryStore(max_messages=max_messages), checkpointer
+
+    return make
+
+
+def contents(messages):
+    return [message.content for message in messages]
+
+
+def test_first_page_warms_cache_then_reads_it(store):
+    history_store, checkpointer = store(12)
+
+    for _ in range(2):
+        messages, has_more = history_store.page("c1", limit=2)
+        assert contents(messages) == ["m10", "m11"]
+        assert has_more
+
+    assert checkpointer.reads == 1
+
+
+def test_last_page_inside_cache_window(store):
+    history_store, checkpointer = store(12)
+    history_store.page("c1", limit=2)
+
+    # offset + limit == max_messages - 1, the older neighbour is still cached.
+    messages, has_more = history_store.page("c1", limit=2, offset=2)
+
+    assert contents(messages) == ["m8", "m9"]
+    assert has_more
+    assert checkpointer.reads == 1
+
+
+def test_page_reaching_cache_edge_reads_checkpoint(store):
+    history_store, checkpointer = store(12)
+    history_store.page("c1", limit=2)
+
+    messages, has_more = history_store.page("c1", limit=2, offset=3)
+
+    assert contents(messages) == ["m7", "m8"]
+    assert has_more
+    assert checkpointer.reads == 2
+
+
+@pytest.mark.parametrize("limit, has_more", [(3, True), (4, False)])
+def test_has_more_at_start_of_short_conversation(store, limit, has_more):
+    history_store, _ = store(4)
+    history_store.page("c1", limit=1)
+
+    messages, more = history_store.page("c1", limit=limit)
+
+    assert contents(messages) == ["m0", "m1", "m2", "m3"][-limit:]
+    assert more is has_more
+
+
+def test_page_past_cache_size(store):
+    history_store, checkpointer = store(12)
+
+    messages, has_more = history_store.page("c1", limit=5, offset=10)
+    assert contents(messages) == ["m0", "m1"]
+    assert not has_more
+
+    assert history_store.page("c1", limit=5, offset=12) == ([], False)
+    # Pages outside the cached window never warm the cache.
+    assert history.get_redis().lists == {}
+    assert checkpointer.reads == 2
@@ -0,0 +1,94 @@
+import zipfile
+from src.agent.loaders import iter_docx_paragraphs, load_transcript
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_srt_speaker_carries_to_continuation_lines(tmp_path):
+    path = write(
+        tmp_path,
+        "meeting.srt",
+        "1\n"
+        "00:00:01,000 --> 00:00:03,000\n"
+        "Bob: hi\n"
+        "second line\n"
+        "\n"
+        "2\n"
+        "00:00:03,000 --> 00:00:05,000\n"
+        "still Bob\n"
+        "\n"
+        "3\n"
+        "00:00:05,000 --> 00:00:07,000\n"
+        "Alice: hello\n",
+    )
+
+    transcript = load_transcript(path, "meeting.srt")
+
+    assert transcript.text == "Bob: hi second line still Bob\nAlice: hello"
+    assert transcript.structured
+
+
+def test_vtt_voice_tag_carries_to_continuation_lines(tmp_path):
+    path = write(
+        tmp_path,
+        "meeting.vtt",
+        "WEBVTT\n"
+        "\n"
+        "00:00:01.000 --> 00:00:03.000\n"
+        "<v Bob>Note: first line</v>\n"
+        "second line\n"
+        "\n"
+        "00:00:03.000 --> 00:00:05.000\n"
+        "<v.loud Alice>hello</v>\n",
+    )
+
+    transcript = load_transcript(path, "meeting.vtt")
+
+    assert transcript.text == "Bob: Note: first line second line\nAlice: hello"
+    assert transcript.structured
+
+
+def test_unlabelled_cues_stay_unlabelled(tmp_path):
+    path = write(
+        tmp_path,
+        "captions.srt",
+        "1\n00:00:01,000 --> 00:00:03,000\nno speaker here\n",
+    )
+
+    transcript = load_transcript(path, "captions.srt")
+
+    assert transcript.text == "no speaker here"
+    assert not transcript.structured
+
+
+def write_docx(tmp_path, body):
+    path = tmp_path / "meeting.docx"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr(
+            "word/document.xml",
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/'
+            f'wordprocessingml/2006/main"><w:body>{body}</w:body></w:document>',
+        )
+    return str(path)
+
+
+def test_docx_nested_paragraph_keeps_outer_text(tmp_path):
+    path = write_docx(
+        tmp_path,
+        "<w:p><w:r><w:t>Bob: before</w:t></w:r>"
+        "<w:r><w:pict><w:txbxContent>"
+        "<w:p><w:r><w:t>Alice: boxed</w:t></w:r></w:p>"
+        "</w:txbxContent></w:pict></w:r>"
+        "<w:r><w:t> after</w:t></w:r></w:p>"
+        "<w:sdt><w:sdtContent>"
+        "<w:p><w:r><w:t>Carol: wrapped</w:t><w:tab/><w:t>text</w:t></w:r></w:p>"
+        "</w:sdtContent></w:sdt>",
+    )
+
+    paragraphs = list(iter_docx_paragraphs(path))
+
+    assert paragraphs == ["Alice: boxed", "Bob: before after", "Carol: wrapped\ttext"]
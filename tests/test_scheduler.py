@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import time
+import httpx
+import pytest
+from openai import RateLimitError
+from src.agent import scheduler
+from src.agent.scheduler import (
+    ModelScheduler,
+    Priority,
+    PrioritySemaphore,
+    TokenBudget,
+)
+
+
+def rate_limit_error(retry_after="0"):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(429, headers={"retry-after": retry_after}, request=request)
+    return RateLimitError("rate limited", response=response, body=None)
+
+
+def test_release_wakes_interactive_before_earlier_batch():
+    semaphore = PrioritySemaphore(1)
+    order = []
+
+    async def worker(name, priority):
+        await semaphore.acquire(priority)
+        order.append(name)
+        semaphore.release()
+
+    async def main():
+        await semaphore.acquire()
+        batch = asyncio.create_task(worker("batch", Priority.BATCH))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(worker("interactive", Priority.INTERACTIVE))
+        await asyncio.sleep(0)
+        semaphore.release()
+        await asyncio.gather(batch, interactive)
+
+    asyncio.run(main())
+
+    assert order == ["interactive", "batch"]
+
+
+def test_cancelled_waiter_returns_a_granted_slot():
+    semaphore = PrioritySemaphore(1)
+
+    async def main():
+        await semaphore.acquire()
+        waiter = asyncio.create_task(semaphore.acquire())
+        await asyncio.sleep(0)
+        semaphore.release()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.wait_for(semaphore.acquire(), timeout=1)
+
+    asyncio.run(main())
+
+
+def test_slot_passes_on_when_waiter_loop_is_closed():
+    semaphore = PrioritySemaphore(1)
+    semaphore.acquire_sync()
+
+    dead_loop = asyncio.new_event_loop()
+    abandoned = dead_loop.create_task(semaphore.acquire())
+    dead_loop.run_until_complete(asyncio.sleep(0))
+    dead_loop.close()
+    abandoned._log_destroy_pending = False
+
+    acquired = threading.Event()
+
+    def blocked():
+        semaphore.acquire_sync()
+        acquired.set()
+
+    thread = threading.Thread(target=blocked, daemon=True)
+    thread.start()
+    while len(semaphore._waiters) < 2:
+        time.sleep(0.001)
+
+    semaphore.release()
+
+    assert acquired.wait(timeout=1)
+
+
+def test_batch_callers_cannot_take_the_interactive_reserve():
+    budget = TokenBudget(tokens_per_minute=600, interactive_reserve=0.5)
+
+    assert budget.try_take(300, Priority.BATCH) == 0
+    assert budget.try_take(10, Priority.BATCH) > 0
+    assert budget.try_take(300, Priority.INTERACTIVE) == 0
+
+
+def test_oversized_batch_request_fits_a_full_bucket():
+    budget = TokenBudget(tokens_per_minute=600, interactive_reserve=0.5)
+
+    assert budget.try_take(10_000, Priority.BATCH) == 0
+    assert budget.try_take(10, Priority.BATCH) > 0
+
+
+def test_run_retries_429_with_pause_and_refund():
+    model_scheduler = ModelScheduler("test-model", 1, 600)
+    calls = []
+
+    async def call():
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise rate_limit_error("0.05")
+        return "ok"
+
+    result = asyncio.run(model_scheduler.run(call, 100, Priority.BATCH))
+
+    assert result == "ok"
+    assert len(calls) == 2
+    assert calls[1] - calls[0] >= 0.05
+    # Only the successful call is charged against the budget.
+    assert model_scheduler.budget._tokens == pytest.approx(500, abs=5)
+    assert model_scheduler.semaphore._value == 1
+
+
+def test_run_sync_raises_after_max_retries(monkeypatch):
+    monkeypatch.setattr(scheduler, "LLM_MAX_RETRIES", 1)
+    model_scheduler = ModelScheduler("test-model", 1, 600)
+    calls = []
+
+    def call():
+        calls.append(1)
+        raise rate_limit_error()
+
+    with pytest.raises(RateLimitError):
+        model_scheduler.run_sync(call, 100, Priority.BATCH)
+
+    assert len(calls) == 2
+    assert model_scheduler.budget._tokens == pytest.approx(500, abs=5)
+    assert model_scheduler.semaphore._value == 1